@@ -0,0 +1,126 @@
+# backend/circuit.py
+import collections
+import threading
+import time
+from typing import NamedTuple
+
+__all__ = ["CircuitOpenError", "CircuitBreaker", "CallToken"]
+
+
+class CircuitOpenError(Exception):
+    """The backend is considered down; the call was rejected without being made."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CallToken(NamedTuple):
+    """Handed out by before_call() and passed back with the call's outcome."""
+
+    generation: int
+    probe: bool
+
+
+class CircuitBreaker:
+    """
+    Closed -> open when, over the last `window` calls (at least `min_calls`),
+    the share of failed or slow (> slow_call_seconds) calls reaches
+    `failure_ratio`. While open every call fails fast with CircuitOpenError.
+    After `open_seconds` the breaker half-opens and lets `probe_calls` calls
+    through; if they all succeed it closes, any failure re-opens it.
+
+    Every state change starts a new generation. Outcomes are only counted
+    against the generation their call started in, so a slow call from before
+    the breaker opened cannot re-open it, or close it, once it has half-opened.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(
+        self,
+        failure_ratio: float = 0.5,
+        window: int = 20,
+        min_calls: int = 10,
+        slow_call_seconds: float = 30.0,
+        open_seconds: float = 30.0,
+        probe_calls: int = 2,
+    ):
+        self._failure_ratio = failure_ratio
+        self._min_calls = min_calls
+        self._slow_call_seconds = slow_call_seconds
+        self._open_seconds = open_seconds
+        self._probe_calls = max(1, probe_calls)
+        self._outcomes = collections.deque(maxlen=window)  # True = bad call
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probes_started = 0
+        self._probes_ok = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _maybe_half_open(self) -> None:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self._open_seconds:
+            self._state = self.HALF_OPEN
+            self._generation += 1
+            self._probes_started = 0
+            self._probes_ok = 0
+
+    def _open(self) -> None:
+        self._state = self.OPEN
+        self._generation += 1
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+
+    def _close(self) -> None:
+        self._state = self.CLOSED
+        self._generation += 1
+        self._outcomes.clear()
+
+    def before_call(self) -> CallToken:
+        """
+        Raise CircuitOpenError unless a call may go to the backend now. The
+        returned token goes back to record() or release_probe().
+        """
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == self.OPEN:
+                retry_after = self._open_seconds - (time.monotonic() - self._opened_at)
+                raise CircuitOpenError("model backend unavailable (circuit open)", max(0.0, retry_after))
+            if self._state == self.HALF_OPEN:
+                if self._probes_started >= self._probe_calls:
+                    raise CircuitOpenError("model backend recovering (probe in progress)", 1.0)
+                self._probes_started += 1
+                return CallToken(self._generation, True)
+            return CallToken(self._generation, False)
+
+    def record(self, token: CallToken, seconds: float, failed: bool) -> None:
+        """Report the outcome of a call allowed by before_call(); stale outcomes are ignored."""
+        bad = failed or seconds > self._slow_call_seconds
+        with self._lock:
+            if token.generation != self._generation:
+                return
+            if token.probe:
+                if bad:
+                    self._open()
+                else:
+                    self._probes_ok += 1
+                    if self._probes_ok >= self._probe_calls:
+                        self._close()
+                return
+            self._outcomes.append(bad)
+            if len(self._outcomes) >= self._min_calls:
+                if sum(self._outcomes) / len(self._outcomes) >= self._failure_ratio:
+                    self._open()
+
+    def release_probe(self, token: CallToken) -> None:
+        """Give back a half-open probe slot for a call that ended without a verdict."""
+        with self._lock:
+            if token.probe and token.generation == self._generation and self._probes_started > self._probes_ok:
+                self._probes_started -= 1
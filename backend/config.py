@@ -0,0 +1,121 @@
+# backend/config.py
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _int_env(name: str, default: int) -> int:
+    """Read an integer setting from the environment, falling back to default."""
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+def _str_env(name: str, default: str) -> str:
+    value = os.getenv(name)
+    return value.strip() if value and value.strip() else default
+
+
+# Model backend used by the API: "gemini", or "fake" for offline load tests
+MODEL_BACKEND = _str_env("MODEL_BACKEND", "gemini").lower()
+# Fake backend: log-normal latency (median ms, spread as % sigma), % malformed answers,
+# % injected failures, RNG seed, optional JSONL file of canned raw responses
+FAKE_LATENCY_MEDIAN_MS = max(0, _int_env("FAKE_LATENCY_MEDIAN_MS", 2000))
+FAKE_LATENCY_SIGMA_PCT = max(0, _int_env("FAKE_LATENCY_SIGMA_PCT", 50))
+FAKE_MALFORMED_PCT = min(100, max(0, _int_env("FAKE_MALFORMED_PCT", 5)))
+FAKE_ERROR_PCT = min(100, max(0, _int_env("FAKE_ERROR_PCT", 0)))
+FAKE_SEED = _int_env("FAKE_SEED", 0)
+FAKE_RESPONSES_FILE = os.getenv("FAKE_RESPONSES_FILE", "")
+
+# Upper bound on Gemini calls running at the same time in this process
+GEMINI_MAX_WORKERS = max(1, _int_env("GEMINI_MAX_WORKERS", 8))
+# Model-call limiter: in-flight calls per process, requests per minute (0 = unlimited)
+# and burst size, longest a call may queue for a slot, and an optional SQLite file that
+# shares the requests-per-minute budget between worker processes
+GEMINI_MAX_IN_FLIGHT = max(1, _int_env("GEMINI_MAX_IN_FLIGHT", GEMINI_MAX_WORKERS))
+GEMINI_RPM = max(0, _int_env("GEMINI_RPM", 0))
+GEMINI_BURST = max(1, _int_env("GEMINI_BURST", 5))
+GEMINI_LIMIT_WAIT_SECONDS = max(0, _int_env("GEMINI_LIMIT_WAIT_SECONDS", 30))
+GEMINI_LIMITER_DB = os.getenv("GEMINI_LIMITER_DB", "")
+# Retries: attempts per call, timeout per attempt, overall budget, jittered backoff bounds
+GEMINI_MAX_ATTEMPTS = max(1, _int_env("GEMINI_MAX_ATTEMPTS", 3))
+GEMINI_CALL_TIMEOUT_SECONDS = max(1, _int_env("GEMINI_CALL_TIMEOUT_SECONDS", 30))
+GEMINI_DEADLINE_SECONDS = max(1, _int_env("GEMINI_DEADLINE_SECONDS", 60))
+GEMINI_BACKOFF_BASE_MS = max(0, _int_env("GEMINI_BACKOFF_BASE_MS", 500))
+GEMINI_BACKOFF_MAX_MS = max(0, _int_env("GEMINI_BACKOFF_MAX_MS", 8000))
+# Circuit breaker: open when this % of the last WINDOW calls (at least MIN_CALLS) failed or
+# took longer than SLOW_CALL_SECONDS; stay open OPEN_SECONDS, then let PROBES calls test recovery
+GEMINI_BREAKER_FAILURE_PCT = min(100, max(1, _int_env("GEMINI_BREAKER_FAILURE_PCT", 50)))
+GEMINI_BREAKER_WINDOW = max(1, _int_env("GEMINI_BREAKER_WINDOW", 20))
+GEMINI_BREAKER_MIN_CALLS = max(1, _int_env("GEMINI_BREAKER_MIN_CALLS", 10))
+GEMINI_BREAKER_SLOW_CALL_SECONDS = max(1, _int_env("GEMINI_BREAKER_SLOW_CALL_SECONDS", 25))
+GEMINI_BREAKER_OPEN_SECONDS = max(1, _int_env("GEMINI_BREAKER_OPEN_SECONDS", 30))
+GEMINI_BREAKER_PROBES = max(1, _int_env("GEMINI_BREAKER_PROBES", 2))
+# Hedging (off by default): once MIN_SAMPLES attempts are recorded, a call still running after
+# the PERCENTILE latency gets a duplicate; duplicates are capped at BUDGET_PCT of calls
+GEMINI_HEDGE_ENABLED = _int_env("GEMINI_HEDGE_ENABLED", 0) != 0
+GEMINI_HEDGE_PERCENTILE = min(99, max(50, _int_env("GEMINI_HEDGE_PERCENTILE", 95)))
+GEMINI_HEDGE_BUDGET_PCT = min(100, max(0, _int_env("GEMINI_HEDGE_BUDGET_PCT", 5)))
+GEMINI_HEDGE_MIN_SAMPLES = max(1, _int_env("GEMINI_HEDGE_MIN_SAMPLES", 50))
+
+# Currency conversion: JSON rates file (default backend/fx_rates.json) and how often
+# its modification time is checked for a reload
+FX_RATES_FILE = os.getenv("FX_RATES_FILE", "")
+FX_CHECK_INTERVAL_SECONDS = max(1, _int_env("FX_CHECK_INTERVAL_SECONDS", 300))
+
+# How long a content-hash match may be reused instead of calling the model (0 disables)
+DEDUP_TTL_SECONDS = max(0, _int_env("DEDUP_TTL_SECONDS", 30 * 24 * 3600))
+
+# Near-duplicate detection: "flag" marks likely duplicate claims, "reuse" returns
+# the earlier analysis without a model call, "off" skips the perceptual-hash stage
+PHASH_MODE = _str_env("PHASH_MODE", "flag").lower()
+# Maximum Hamming distance (out of 64 bits) for two images to count as near-duplicates
+PHASH_MAX_DISTANCE = max(0, _int_env("PHASH_MAX_DISTANCE", 6))
+
+# Images are downscaled so the longest edge is at most this many pixels before the model call
+IMAGE_MAX_EDGE = max(64, _int_env("IMAGE_MAX_EDGE", 1568))
+# Re-encoding format ("JPEG" or "WEBP") and quality for the image sent to the model
+IMAGE_FORMAT = _str_env("IMAGE_FORMAT", "JPEG").upper()
+IMAGE_QUALITY = min(100, max(1, _int_env("IMAGE_QUALITY", 85)))
+
+# Uploads larger than this are rejected while streaming to disk
+UPLOAD_MAX_BYTES = max(1, _int_env("UPLOAD_MAX_BYTES", 25 * 1024 * 1024))
+UPLOAD_CHUNK_BYTES = max(4096, _int_env("UPLOAD_CHUNK_BYTES", 256 * 1024))
+
+# SQLite connection pragmas applied by backend.database on every new connection
+SQLITE_JOURNAL_MODE = _str_env("SQLITE_JOURNAL_MODE", "WAL").upper()
+SQLITE_SYNCHRONOUS = _str_env("SQLITE_SYNCHRONOUS", "NORMAL").upper()
+SQLITE_CACHE_SIZE_KB = max(0, _int_env("SQLITE_CACHE_SIZE_KB", 64 * 1024))
+SQLITE_MMAP_SIZE = max(0, _int_env("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+SQLITE_BUSY_TIMEOUT_MS = max(0, _int_env("SQLITE_BUSY_TIMEOUT_MS", 5000))
+
+# Write-behind batching of Analysis inserts: commit after this many rows or this many ms
+WRITE_BATCH_SIZE = max(1, _int_env("WRITE_BATCH_SIZE", 32))
+WRITE_FLUSH_INTERVAL_MS = max(1, _int_env("WRITE_FLUSH_INTERVAL_MS", 20))
+# 1: /analyze/ waits for its batch to commit; 0: return once the row is queued in memory
+WRITE_WAIT_FOR_COMMIT = _int_env("WRITE_WAIT_FOR_COMMIT", 1) != 0
+
+# /analyze/batch: most photos accepted per claim and model calls in flight per batch
+BATCH_MAX_FILES = max(1, _int_env("BATCH_MAX_FILES", 20))
+BATCH_CONCURRENCY = max(1, _int_env("BATCH_CONCURRENCY", 4))
+# packed=true: most photos sent together in one multimodal request
+PACKED_MAX_IMAGES = max(1, _int_env("PACKED_MAX_IMAGES", 6))
+
+# mode=async on /analyze/: worker tasks in the API process (0 = only `python -m backend.worker`),
+# how long finished job results are kept, webhook timeout
+JOB_WORKERS = max(0, _int_env("JOB_WORKERS", 4))
+JOB_RESULT_TTL_SECONDS = max(1, _int_env("JOB_RESULT_TTL_SECONDS", 3600))
+JOB_WEBHOOK_TIMEOUT_SECONDS = max(1, _int_env("JOB_WEBHOOK_TIMEOUT_SECONDS", 10))
+# Comma-separated hosts callback_url may point at (a leading "." matches subdomains);
+# empty: any public http(s) host, never loopback / private / link-local addresses
+JOB_WEBHOOK_ALLOWED_HOSTS = [h.strip().lower() for h in os.getenv("JOB_WEBHOOK_ALLOWED_HOSTS", "").split(",") if h.strip()]
+# Durable job queue: lease length, attempts before a job fails, base retry delay, idle poll interval
+JOB_LEASE_SECONDS = max(1, _int_env("JOB_LEASE_SECONDS", 120))
+JOB_MAX_ATTEMPTS = max(1, _int_env("JOB_MAX_ATTEMPTS", 3))
+JOB_RETRY_BACKOFF_SECONDS = max(0, _int_env("JOB_RETRY_BACKOFF_SECONDS", 5))
+JOB_POLL_INTERVAL_MS = max(10, _int_env("JOB_POLL_INTERVAL_MS", 500))
@@ -0,0 +1,136 @@
+# backend/cost_parser.py
+import functools
+import re
+from typing import NamedTuple
+
+__all__ = ["CostRange", "ZERO_COST", "parse_cost"]
+
+
+class CostRange(NamedTuple):
+    low: float
+    high: float
+    mid: float
+
+
+ZERO_COST = CostRange(0.0, 0.0, 0.0)
+
+_MULTIPLIERS = {
+    "k": 1e3,
+    "thousand": 1e3,
+    "lakh": 1e5,
+    "lakhs": 1e5,
+    "lac": 1e5,
+    "lacs": 1e5,
+    "mn": 1e6,
+    "million": 1e6,
+    "cr": 1e7,
+    "crore": 1e7,
+    "crores": 1e7,
+}
+
+# digits with grouping/decimal separators: 1,500  1.500,50  12,34,567  1'500  1 500 (NBSP / narrow NBSP)
+_NUM = r"\d+(?:[.,'\u00a0\u202f]\d+)*"
+# Case-insensitive only where letters can match (a pattern-wide IGNORECASE
+# slows every digit and separator test), and behind a first-letter lookahead
+# so the alternation is only tried when a unit can start there
+_UNIT = r"(?=[cklmtCKLMT])(?i:k|thousand|lakhs?|lacs?|mn|million|crores?|cr)"
+# "50-100", "$400 - $650", "12k–15k", "Rs. 500 to Rs. 800", "1 to 2 lakh". The
+# lookahead sits inside the unit group: after a bare number it would make the
+# regex give back digits ("500USD" -> 50) rather than fail.
+_COST_RE = re.compile(
+    rf"(?P<lo>{_NUM})(?:\s*(?P<lo_unit>{_UNIT})(?![a-zA-Z]))?"
+    rf"(?:\s*(?:[-–—~]|(?=[aAtT])(?i:to|and))\s*(?:[^\d\s]{{1,3}}\.?\s*)?"
+    rf"(?P<hi>{_NUM})(?:\s*(?P<hi_unit>{_UNIT})(?![a-zA-Z]))?)?"
+)
+_DROP_GROUPING = str.maketrans("", "", "'\u00a0\u202f")
+
+
+def _to_float(token: str) -> float:
+    """Read one number token, working out which of ',' and '.' is the decimal separator."""
+    if "," not in token:
+        try:
+            return float(token)  # 300, 1.5
+        except ValueError:
+            pass
+        token = token.translate(_DROP_GROUPING)  # 1'500, 1 500
+        if token.count(".") > 1:
+            token = token.replace(".", "")  # 1.234.567
+        return float(token)
+    comma = token.rfind(",")
+    plain = token.replace(",", "")
+    if len(token) - comma == 4 and plain.isdecimal():
+        return float(plain)  # 33,000 / 1,00,000
+    if "'" in token or "\u00a0" in token or "\u202f" in token:
+        token = token.translate(_DROP_GROUPING)
+        comma = token.rfind(",")
+    dot = token.rfind(".")
+    if dot >= 0:
+        # whichever comes last is the decimal separator: 1,234.50 / 1.234,50
+        if comma > dot:
+            return float(token.replace(".", "").replace(",", "."))
+        return float(token.replace(",", ""))
+    # a single comma not followed by a 3-digit group is a decimal comma: 12,5
+    if len(token) - comma != 4 and token.count(",") == 1:
+        return float(token.replace(",", "."))
+    return float(token.replace(",", ""))
+
+
+_new_range = tuple.__new__  # CostRange(...) goes through a Python-level __new__
+
+
+def _scan(text: str) -> CostRange:
+    # the prompt asks for "75" or "50-100"; those need no regex
+    if text.isdecimal():
+        v = float(text)
+        return _new_range(CostRange, (v, v, v))
+    lo, sep, hi = text.partition("-")
+    if sep and lo.isdecimal() and hi.isdecimal():
+        low, high = float(lo), float(hi)
+        if low > high:
+            low, high = high, low
+        return _new_range(CostRange, (low, high, (low + high) / 2.0))
+    m = _COST_RE.search(text)
+    if m is None:
+        return ZERO_COST
+    lo, lo_unit, hi, hi_unit = m.groups()
+    try:
+        low = float(lo) if lo.isdecimal() else _to_float(lo)
+        if hi is None:
+            if lo_unit:
+                low *= _MULTIPLIERS[lo_unit.lower()]
+            return _new_range(CostRange, (low, low, low))
+        high = float(hi) if hi.isdecimal() else _to_float(hi)
+    except ValueError:
+        return ZERO_COST
+    if hi_unit:
+        hi_mult = _MULTIPLIERS[hi_unit.lower()]
+        # "12-15k" means 12k-15k, but "1500-2k" does not mean 1500k-2k
+        if not lo_unit and low < high:
+            low *= hi_mult
+        high *= hi_mult
+    if lo_unit:
+        low *= _MULTIPLIERS[lo_unit.lower()]
+    if low > high:
+        low, high = high, low
+    return _new_range(CostRange, (low, high, (low + high) / 2.0))
+
+
+# model answers reuse a small set of round figures, so most lookups are hits
+_scan_cached = functools.lru_cache(maxsize=4096)(_scan)
+
+
+def parse_cost(value) -> CostRange:
+    """
+    Parse a model cost field ("150-250", "$400 - $650", "₹1.2 lakh",
+    "¥60,000", "12k–15k", 300) into a non-negative CostRange. Only the first
+    amount, and a second one joined to it by a range separator, are read;
+    anything unparseable is ZERO_COST.
+    """
+    if isinstance(value, str):
+        return _scan_cached(value)
+    if value is None:
+        return ZERO_COST
+    if isinstance(value, (int, float)):
+        v = abs(float(value))
+        return CostRange(v, v, v)
+    return _scan_cached(str(value))
@@ -1,15 +1,74 @@
 # backend/database.py
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime
+from sqlalchemy import create_engine, event, Column, Integer, String, Float, DateTime, Text, LargeBinary, ForeignKey, Index
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base, sessionmaker, Session
 from datetime import datetime
+import os
 
-# Database URL (SQLite)
-DATABASE_URL = "sqlite:///./car_ai.db"
+from backend.config import (
+    SQLITE_JOURNAL_MODE,
+    SQLITE_SYNCHRONOUS,
+    SQLITE_CACHE_SIZE_KB,
+    SQLITE_MMAP_SIZE,
+    SQLITE_BUSY_TIMEOUT_MS,
+)
 
-# Engine & Session
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+# Database URL (SQLite by default)
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./car_ai.db")
+
+# Async driver for the same database (used by the API)
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def _async_url(url):
+    scheme, sep, rest = url.partition("://")
+    return _ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _async_url(DATABASE_URL)
+_IS_SQLITE = DATABASE_URL.startswith("sqlite")
+
+# Connection pragmas: WAL lets /history readers run while /analyze/ commits
+SQLITE_PRAGMAS = {
+    "journal_mode": SQLITE_JOURNAL_MODE,
+    "synchronous": SQLITE_SYNCHRONOUS,
+    "cache_size": -SQLITE_CACHE_SIZE_KB,  # negative = size in KiB
+    "mmap_size": SQLITE_MMAP_SIZE,
+    "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+}
+
+
+def enable_sqlite_pragmas(target_engine, pragmas=None):
+    """Run the given PRAGMAs (default SQLITE_PRAGMAS) on every new connection of a SQLite engine."""
+    pragmas = dict(SQLITE_PRAGMAS if pragmas is None else pragmas)
+
+    @event.listens_for(target_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    return target_engine
+
+
+# Engine & Session (sync: scripts, background writer, streaming export)
+engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False} if _IS_SQLITE else {})
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine & session for the API endpoints
+async_engine = create_async_engine(ASYNC_DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+if _IS_SQLITE:
+    enable_sqlite_pragmas(engine)
+    enable_sqlite_pragmas(async_engine.sync_engine)
+
 # Base class for models
 Base = declarative_base()
 
@@ -26,6 +85,68 @@ class Analysis(Base):
     cost_yen = Column(Float, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # keyset pagination of /history walks (created_at, id) descending
+        Index("ix_analysis_created_at_id", "created_at", "id"),
+    )
+
+# Content-hash index: SHA-256 of uploaded bytes -> earlier analysis
+class ImageDigest(Base):
+    __tablename__ = "image_digest"
+
+    digest = Column(String(64), primary_key=True)
+    analysis_id = Column(Integer, ForeignKey("analysis.id"), nullable=False)
+    result_json = Column(Text, nullable=False)  # normalized analysis as returned to the client
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+# Perceptual hash of each analysed image, used for near-duplicate lookups
+class ImageFingerprint(Base):
+    __tablename__ = "image_fingerprint"
+
+    analysis_id = Column(Integer, ForeignKey("analysis.id"), primary_key=True)
+    phash = Column(String(16), nullable=False)  # 64-bit hash as hex
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+# Compressed model answer behind each analysis (see backend.raw_store)
+class AnalysisRaw(Base):
+    __tablename__ = "analysis_raw"
+
+    analysis_id = Column(Integer, ForeignKey("analysis.id"), primary_key=True)
+    codec = Column(String(16), nullable=False)  # e.g. "zlib-d1": zlib with preset dictionary v1
+    payload = Column(LargeBinary, nullable=False)
+    prompt_version = Column(String(32), nullable=False)
+    model_name = Column(String(64), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+# Durable queue for mode=async analyses (see backend.jobs)
+class AnalysisJob(Base):
+    __tablename__ = "analysis_job"
+
+    id = Column(String(32), primary_key=True)
+    status = Column(String(16), nullable=False, default="queued")  # queued/running/done/failed
+    payload = Column(Text, nullable=False)
+    callback_url = Column(String, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    visible_at = Column(DateTime, nullable=False, default=datetime.utcnow)  # claimable from; lease expiry while running
+    lease_owner = Column(String(64), nullable=True)
+    result_json = Column(Text, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # claim-next-job scans claimable jobs in visibility order
+        Index("ix_analysis_job_claim", "status", "visible_at"),
+    )
+
+def init_db():
+    """Create missing tables, plus indexes added to tables that already exist."""
+    Base.metadata.create_all(bind=engine)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
 # Dependency to get DB session
 def get_db():
     db: Session = SessionLocal()
@@ -33,3 +154,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Async dependency for the API
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
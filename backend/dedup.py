@@ -0,0 +1,38 @@
+# backend/dedup.py
+import json
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from backend.database import ImageDigest
+
+__all__ = ["lookup_digest", "remember_digest"]
+
+
+def lookup_digest(db: Session, digest: str, ttl_seconds: int) -> Optional[dict]:
+    """
+    Return the stored normalized analysis for a byte-identical upload, or None
+    when there is no entry or it is older than ttl_seconds (0 disables lookups).
+    """
+    if ttl_seconds <= 0:
+        return None
+    row = db.get(ImageDigest, digest)
+    if row is None:
+        return None
+    if row.created_at and row.created_at < datetime.utcnow() - timedelta(seconds=ttl_seconds):
+        return None
+    try:
+        return json.loads(row.result_json)
+    except ValueError:
+        return None
+
+
+def remember_digest(db: Session, digest: str, analysis_id: int, normalized: dict) -> None:
+    """Point the digest at the given analysis row (replacing any older entry). Caller commits."""
+    db.merge(ImageDigest(
+        digest=digest,
+        analysis_id=analysis_id,
+        result_json=json.dumps(normalized),
+        created_at=datetime.utcnow(),
+    ))
@@ -0,0 +1,148 @@
+# backend/fake_model.py
+import json
+import math
+import random
+import threading
+import time
+from typing import List, Optional
+
+from backend.config import (
+    FAKE_LATENCY_MEDIAN_MS,
+    FAKE_LATENCY_SIGMA_PCT,
+    FAKE_MALFORMED_PCT,
+    FAKE_ERROR_PCT,
+    FAKE_SEED,
+    FAKE_RESPONSES_FILE,
+)
+from backend.normalize import parse_model_text
+
+__all__ = ["FakeGenerativeModel", "FakeBackendError", "fake_model"]
+
+
+class FakeBackendError(ConnectionError):
+    """Injected transient failure from FakeGenerativeModel."""
+
+
+_CANNED_RESPONSES = [
+    {
+        "damages": [{"part": "front bumper", "damage_type": "dent"}],
+        "estimated_cost": {"usd": "150-250"},
+        "notes": "Check bumper brackets for cracks.",
+    },
+    {
+        "damages": [
+            {"part": "rear left door", "damage_type": "scratch"},
+            {"part": "rear left quarter panel", "damage_type": "dent"},
+        ],
+        "estimated_cost": {"usd": "$400 - $650"},
+        "notes": "Paint matching needed across two panels.",
+    },
+    {
+        "damages": [{"part": "headlight", "damage_type": "broken"}],
+        "estimated_cost": {"usd": "300"},
+        "notes": "Headlight housing cracked; inspect wiring.",
+    },
+]
+
+_MALFORMED_RESPONSES = [
+    "Sorry, I can't assess this image clearly.",
+    'Here is the assessment: {"damages": [{"part": "hood", "damage_type": "dent"}], "estimated_cost": {"usd": "200"}',
+    "```json\n{\"damages\": [], \"notes\": \"no visible damage\"}\n```",
+]
+
+
+class _FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """
+    Offline stand-in for genai.GenerativeModel, handed to gemini_client by
+    GeminiBackend(fake=True), so load tests still run through the model pool,
+    limiter, retries, circuit breaker and hedging. generate_content blocks for a
+    log-normal latency (median `latency_median` s, spread `latency_sigma`),
+    honouring request_options["timeout"], then returns a canned JSON answer, a
+    malformed one (`malformed_ratio`), or raises FakeBackendError
+    (`error_ratio`). Seeded, so a run's sequence of latencies and outcomes is
+    repeatable.
+    """
+
+    def __init__(
+        self,
+        latency_median: float = FAKE_LATENCY_MEDIAN_MS / 1000.0,
+        latency_sigma: float = FAKE_LATENCY_SIGMA_PCT / 100.0,
+        malformed_ratio: float = FAKE_MALFORMED_PCT / 100.0,
+        error_ratio: float = FAKE_ERROR_PCT / 100.0,
+        seed: int = FAKE_SEED,
+        responses: Optional[List[str]] = None,
+    ):
+        self._latency_median = latency_median
+        self._latency_sigma = latency_sigma
+        self._malformed_ratio = malformed_ratio
+        self._error_ratio = error_ratio
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._responses = responses or [json.dumps(r) for r in _CANNED_RESPONSES]
+        self._calls = 0
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "FakeGenerativeModel":
+        """Load canned model outputs from a file, one raw response text per line (JSONL)."""
+        with open(path, encoding="utf-8") as f:
+            lines = [line.rstrip("\n") for line in f if line.strip()]
+        return cls(responses=lines, **kwargs)
+
+    def _draw(self):
+        with self._lock:
+            self._calls += 1
+            latency = self._latency_median * math.exp(self._rng.gauss(0.0, self._latency_sigma))
+            roll = self._rng.random()
+            if roll < self._error_ratio:
+                return latency, None
+            if roll < self._error_ratio + self._malformed_ratio:
+                return latency, self._rng.choice(_MALFORMED_RESPONSES)
+            return latency, self._responses[self._calls % len(self._responses)]
+
+    def _batch_text(self, count: int) -> Optional[str]:
+        items = []
+        for i in range(count):
+            _, text = self._draw()
+            if text is None:
+                return None
+            parsed = parse_model_text(text)
+            if "raw_output" in parsed:
+                return text
+            parsed["image"] = i + 1
+            items.append(parsed)
+        return json.dumps({"images": items})
+
+    def generate_content(self, parts, generation_config=None, request_options=None):
+        # packed requests label each image with an "Image N:" text part
+        images = sum(1 for p in parts if isinstance(p, dict))
+        packed = any(isinstance(p, str) and p.startswith("Image ") for p in parts)
+        latency, text = self._draw()
+        if packed and text is not None:
+            text = self._batch_text(images)
+        timeout = (request_options or {}).get("timeout")
+        if timeout is not None and latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError("fake model call timed out")
+        time.sleep(latency)
+        if text is None:
+            raise FakeBackendError("injected backend failure")
+        return _FakeResponse(text)
+
+
+_model: Optional[FakeGenerativeModel] = None
+_model_lock = threading.Lock()
+
+
+def fake_model() -> FakeGenerativeModel:
+    """The process-wide fake model, configured from the FAKE_* settings."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = FakeGenerativeModel.from_file(FAKE_RESPONSES_FILE) if FAKE_RESPONSES_FILE else FakeGenerativeModel()
+    return _model
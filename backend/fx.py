@@ -0,0 +1,78 @@
+# backend/fx.py
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from backend.config import FX_RATES_FILE, FX_CHECK_INTERVAL_SECONDS
+
+__all__ = ["BASE_CURRENCY", "FxTable", "fx_table"]
+
+logger = logging.getLogger(__name__)
+
+# the currency the model is asked to estimate in
+BASE_CURRENCY = "USD"
+
+_DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fx_rates.json")
+# used until a rates file has loaded
+_FALLBACK_RATES = {"USD": 1.0, "INR": 88.7, "JPY": 148.9}
+
+
+class FxTable:
+    """
+    Units of each currency per one BASE_CURRENCY, read from a JSON file
+    {"base": "USD", "rates": {"INR": 88.7, "JPY": 148.9, ...}} (a file with a
+    different base is rebased). rates() re-stats the file at most every
+    check_interval seconds and reloads it when it changed, so a cron job can
+    refresh rates without a restart. A file that fails to load leaves the
+    previous rates in place.
+    """
+
+    def __init__(self, path: str = FX_RATES_FILE or _DEFAULT_PATH, check_interval: float = FX_CHECK_INTERVAL_SECONDS):
+        self._path = path
+        self._check_interval = check_interval
+        self._rates: Dict[str, float] = dict(_FALLBACK_RATES)
+        self._mtime: Optional[int] = None
+        self._checked = float("-inf")
+        self._lock = threading.Lock()
+
+    def rates(self) -> Dict[str, float]:
+        """Current {currency code: units per BASE_CURRENCY}; treat as read-only."""
+        if time.monotonic() - self._checked >= self._check_interval:
+            with self._lock:
+                if time.monotonic() - self._checked >= self._check_interval:
+                    self._checked = time.monotonic()
+                    self._maybe_reload()
+        return self._rates
+
+    def _maybe_reload(self) -> None:
+        try:
+            mtime = os.stat(self._path).st_mtime_ns
+        except OSError as e:
+            if self._mtime is not None:
+                logger.warning("FX rates file %s unavailable, keeping previous rates: %s", self._path, e)
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self._path, encoding="utf-8") as f:
+                data = json.load(f)
+            rates = {str(k).upper(): float(v) for k, v in data["rates"].items()}
+            base = str(data.get("base", BASE_CURRENCY)).upper()
+            rates[base] = 1.0
+            if BASE_CURRENCY not in rates or rates[BASE_CURRENCY] <= 0:
+                raise ValueError(f"no positive {BASE_CURRENCY} rate")
+            per_base = rates[BASE_CURRENCY]
+            rates = {code: rate / per_base for code, rate in rates.items() if rate > 0}
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            logger.warning("could not load FX rates from %s, keeping previous rates: %s", self._path, e)
+            return
+        self._rates = rates
+        self._mtime = mtime
+        logger.info("loaded %d FX rates from %s (as of %s)", len(rates), self._path, data.get("as_of", "unknown"))
+
+
+# process-wide table used by backend.normalize
+fx_table = FxTable()
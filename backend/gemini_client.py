@@ -1,21 +1,99 @@
 # backend/gemini_client.py
-import json
-import re
+import asyncio
+import collections
+import functools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
-from typing import Union
+from typing import List, Optional, Union
 from PIL import Image
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
 
-__all__ = ["analyze_damage_bytes", "analyze_image"]
+from backend.config import (
+    GEMINI_MAX_WORKERS,
+    GEMINI_MAX_IN_FLIGHT,
+    GEMINI_RPM,
+    GEMINI_BURST,
+    GEMINI_LIMIT_WAIT_SECONDS,
+    GEMINI_LIMITER_DB,
+    GEMINI_MAX_ATTEMPTS,
+    GEMINI_CALL_TIMEOUT_SECONDS,
+    GEMINI_DEADLINE_SECONDS,
+    GEMINI_BACKOFF_BASE_MS,
+    GEMINI_BACKOFF_MAX_MS,
+    GEMINI_BREAKER_FAILURE_PCT,
+    GEMINI_BREAKER_WINDOW,
+    GEMINI_BREAKER_MIN_CALLS,
+    GEMINI_BREAKER_SLOW_CALL_SECONDS,
+    GEMINI_BREAKER_OPEN_SECONDS,
+    GEMINI_BREAKER_PROBES,
+    GEMINI_HEDGE_ENABLED,
+    GEMINI_HEDGE_PERCENTILE,
+    GEMINI_HEDGE_BUDGET_PCT,
+    GEMINI_HEDGE_MIN_SAMPLES,
+)
+from backend.circuit import CircuitBreaker, CircuitOpenError
+from backend.metrics import LatencyWindow
+from backend.ratelimit import ModelCallLimiter, RateLimitTimeout, SqliteTokenBucket, TokenBucket
+from backend.retry import CallCancelled, DeadlineExceeded, HedgeBudget, RetryPolicy, call_with_retry
+from backend.schema import BATCH_RESPONSE_SCHEMA, DAMAGE_RESPONSE_SCHEMA, ModelAnswer, parse_report, parse_stats
+
+__all__ = [
+    "analyze_damage_bytes",
+    "analyze_damage_bytes_async",
+    "analyze_damage_batch",
+    "analyze_damage_batch_async",
+    "analyze_image",
+    "configure",
+    "get_model",
+    "shutdown_executor",
+    "limiter",
+    "retry_policy",
+    "call_latency",
+    "breaker",
+    "hedge_stats",
+    "parse_stats",
+    "CircuitOpenError",
+    "RateLimitTimeout",
+    "DeadlineExceeded",
+]
+
+logger = logging.getLogger(__name__)
+
+# Bounded pool for the blocking generate_content calls
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=GEMINI_MAX_WORKERS,
+                    thread_name_prefix="gemini",
+                )
+    return _executor
+
+
+def shutdown_executor(wait: bool = True) -> None:
+    """Stop the model-call pool (called on app shutdown)."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
 
-def analyze_damage_bytes(image_bytes: bytes, model_name: str = "gemini-1.5-pro") -> dict:
-    """
-    Send image bytes to Gemini and return a parsed JSON (dict) when possible.
-    If parsing fails, returns {'raw_output': <text>}.
-    """
-    model = genai.GenerativeModel(model_name)
 
-    prompt = """
+# bump when DAMAGE_PROMPT / BATCH_DAMAGE_PROMPT change; stored with each raw answer
+PROMPT_VERSION = "damage-v2"
+
+DAMAGE_PROMPT = """
 You are an expert car damage assessor.
 
 Return the output ONLY as valid JSON in this exact structure:
@@ -25,9 +103,7 @@ Return the output ONLY as valid JSON in this exact structure:
     {"part": "string (e.g. front bumper)", "damage_type": "string (e.g. dent/scratch/broken)"}
   ],
   "estimated_cost": {
-    "usd": "string (range or number, e.g. 50-100 / 75)",
-    "inr": "string",
-    "jpy": "string"
+    "usd": "string (range or number in US dollars, e.g. 50-100 / 75)"
   },
   "notes": "short note about hidden/structural concerns"
 }
@@ -37,23 +113,318 @@ Rules:
 - Use plain numbers or ranges inside the cost strings (currency symbol optional).
 """
 
-    # send the prompt + image bytes
-    response = model.generate_content([prompt, {"mime_type": "image/png", "data": image_bytes}])
-    text = response.text
-
-    # Try direct JSON parse
-    try:
-        return json.loads(text)
-    except Exception:
-        # Fallback: extract first JSON object-like substring
-        m = re.search(r"\{[\s\S]*\}", text)
-        if m:
-            try:
-                return json.loads(m.group(0))
-            except Exception:
-                return {"raw_output": text}
+BATCH_DAMAGE_PROMPT = """
+You are an expert car damage assessor.
+
+You will receive {count} photos of the same vehicle, labelled "Image 1", "Image 2", ...
+Assess each photo on its own.
+
+Return the output ONLY as valid JSON in this exact structure, with one entry per image in order:
+
+{{
+  "images": [
+    {{
+      "image": 1,
+      "damages": [
+        {{"part": "string (e.g. front bumper)", "damage_type": "string (e.g. dent/scratch/broken)"}}
+      ],
+      "estimated_cost": {{
+        "usd": "string (range or number in US dollars, e.g. 50-100 / 75)"
+      }},
+      "notes": "short note about hidden/structural concerns"
+    }}
+  ]
+}}
+
+Rules:
+- Do not print any text outside the JSON object.
+- Use plain numbers or ranges inside the cost strings (currency symbol optional).
+- If the same damage is visible in several images, report it for each image where it is visible.
+"""
+
+# JSON mode constrained to the report schemas in backend.schema
+GENERATION_CONFIG = genai.types.GenerationConfig(
+    candidate_count=1,
+    response_mime_type="application/json",
+    response_schema=DAMAGE_RESPONSE_SCHEMA,
+)
+BATCH_GENERATION_CONFIG = genai.types.GenerationConfig(
+    candidate_count=1,
+    response_mime_type="application/json",
+    response_schema=BATCH_RESPONSE_SCHEMA,
+)
+
+# One GenerativeModel per model name, built lazily and shared by all requests
+_models = {}
+_models_lock = threading.Lock()
+
+
+_configured = False
+
+
+def configure(api_key: Optional[str] = None) -> None:
+    """Configure the Gemini SDK with api_key (default: GEMINI_API_KEY from the environment)."""
+    global _configured
+    api_key = api_key or os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise RuntimeError("GEMINI_API_KEY missing in .env")
+    genai.configure(api_key=api_key)
+    _configured = True
+
+
+def get_model(model_name: str = "gemini-1.5-pro") -> "genai.GenerativeModel":
+    """Return the cached GenerativeModel for model_name, creating it on first use."""
+    model = _models.get(model_name)
+    if model is None:
+        with _models_lock:
+            if not _configured:
+                configure()
+            model = _models.get(model_name)
+            if model is None:
+                model = genai.GenerativeModel(model_name, generation_config=GENERATION_CONFIG)
+                _models[model_name] = model
+    return model
+
+
+def _build_limiter() -> ModelCallLimiter:
+    bucket = None
+    if GEMINI_RPM > 0:
+        if GEMINI_LIMITER_DB:
+            bucket = SqliteTokenBucket(GEMINI_LIMITER_DB, GEMINI_RPM, GEMINI_BURST)
         else:
-            return {"raw_output": text}
+            bucket = TokenBucket(GEMINI_RPM, GEMINI_BURST)
+    return ModelCallLimiter(GEMINI_MAX_IN_FLIGHT, bucket, max_wait=GEMINI_LIMIT_WAIT_SECONDS)
+
+
+# Shared gate for all model calls (concurrency + requests per minute)
+limiter = _build_limiter()
+
+
+# Per-call timeout, overall deadline and jittered backoff for model calls
+retry_policy = RetryPolicy(
+    max_attempts=GEMINI_MAX_ATTEMPTS,
+    attempt_timeout=GEMINI_CALL_TIMEOUT_SECONDS,
+    deadline=GEMINI_DEADLINE_SECONDS,
+    base_backoff=GEMINI_BACKOFF_BASE_MS / 1000.0,
+    max_backoff=GEMINI_BACKOFF_MAX_MS / 1000.0,
+)
+
+# Latency of each generate_content attempt (excluding limiter queueing)
+call_latency = LatencyWindow()
+
+# Fails calls fast while the backend is erroring or too slow
+breaker = CircuitBreaker(
+    failure_ratio=GEMINI_BREAKER_FAILURE_PCT / 100.0,
+    window=GEMINI_BREAKER_WINDOW,
+    min_calls=GEMINI_BREAKER_MIN_CALLS,
+    slow_call_seconds=GEMINI_BREAKER_SLOW_CALL_SECONDS,
+    open_seconds=GEMINI_BREAKER_OPEN_SECONDS,
+    probe_calls=GEMINI_BREAKER_PROBES,
+)
+
+# Hedged calls: at most GEMINI_HEDGE_BUDGET_PCT extra calls, counted in hedge_stats
+hedge_budget = HedgeBudget(ratio=GEMINI_HEDGE_BUDGET_PCT / 100.0)
+hedge_stats = collections.Counter()
+
+# Transient backend failures worth another attempt
+_RETRYABLE_ERRORS = (
+    google_exceptions.TooManyRequests,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.GatewayTimeout,
+    google_exceptions.DeadlineExceeded,
+    TimeoutError,
+    ConnectionError,
+)
+
+
+def _is_retryable(error: BaseException) -> bool:
+    return isinstance(error, _RETRYABLE_ERRORS) and not isinstance(error, (RateLimitTimeout, DeadlineExceeded))
+
+
+def _log_attempt(attempt: int, seconds: float, error: Optional[BaseException]) -> None:
+    if error is None:
+        logger.debug("model call attempt %d succeeded in %.2fs", attempt, seconds)
+    else:
+        logger.info("model call attempt %d failed in %.2fs: %r", attempt, seconds, error)
+
+
+def _generate(
+    model,
+    parts,
+    deadline: Optional[float] = None,
+    cancel: Optional[threading.Event] = None,
+    generation_config=None,
+) -> str:
+    """
+    generate_content (with generation_config overriding the model's, if given) behind the shared limiter, with a per-attempt timeout and
+    retries on transient errors inside the deadline budget (a time.monotonic()
+    value; default now + GEMINI_DEADLINE_SECONDS). Returns the response text.
+    Raises CircuitOpenError while the backend is marked down, RateLimitTimeout
+    if no slot frees up in time, DeadlineExceeded when the budget runs out, or
+    the last backend error. Setting `cancel` abandons the call before its next
+    attempt with CallCancelled.
+    """
+    def _attempt(timeout):
+        if cancel is not None and cancel.is_set():
+            raise CallCancelled("result no longer needed")
+        token = breaker.before_call()
+        t0 = time.monotonic()
+        try:
+            with limiter.slot(max_wait=min(GEMINI_LIMIT_WAIT_SECONDS, timeout)):
+                start = time.monotonic()
+                # time spent queued for the slot comes out of this attempt's timeout
+                remaining = timeout - (start - t0)
+                if remaining <= 0:
+                    breaker.release_probe(token)
+                    raise TimeoutError("attempt timed out waiting for a model-call slot")
+                try:
+                    response = model.generate_content(
+                        parts, generation_config=generation_config, request_options={"timeout": remaining}
+                    )
+                    text = response.text
+                except Exception as e:
+                    elapsed = time.monotonic() - start
+                    call_latency.record(elapsed, type(e).__name__)
+                    # only transient backend errors say anything about backend health
+                    breaker.record(token, elapsed, failed=_is_retryable(e))
+                    raise
+                elapsed = time.monotonic() - start
+                call_latency.record(elapsed)
+                breaker.record(token, elapsed, failed=False)
+                return text
+        except RateLimitTimeout:
+            breaker.release_probe(token)
+            raise
+
+    return call_with_retry(_attempt, retry_policy, _is_retryable, on_attempt=_log_attempt, deadline=deadline)
+
+
+def analyze_damage_bytes(
+    image_bytes: bytes,
+    model_name: str = "gemini-1.5-pro",
+    mime_type: str = "image/png",
+    deadline: Optional[float] = None,
+    cancel: Optional[threading.Event] = None,
+    model=None,
+) -> ModelAnswer:
+    """
+    Send image bytes to Gemini and return the parsed answer (see
+    schema.parse_report); its raw dict is {'raw_output': <text>} if the
+    answer could not be parsed. `model` replaces get_model(model_name), e.g.
+    with backend.fake_model's offline model.
+    """
+    model = model or get_model(model_name)
+
+    # send the prompt + image bytes
+    text = _generate(model, [DAMAGE_PROMPT, {"mime_type": mime_type, "data": image_bytes}], deadline=deadline, cancel=cancel)
+    return parse_report(text)
+
+
+def analyze_damage_batch(
+    images: List[bytes],
+    model_name: str = "gemini-1.5-pro",
+    mime_types: Optional[List[str]] = None,
+    deadline: Optional[float] = None,
+    cancel: Optional[threading.Event] = None,
+    model=None,
+) -> ModelAnswer:
+    """
+    Send several photos of the same vehicle in one multimodal request and ask for
+    damages per image. Returns the parsed answer ({"images": [...]}, see
+    BATCH_DAMAGE_PROMPT); split it per image with schema.split_report.
+    `model` is as for analyze_damage_bytes.
+    """
+    if not images:
+        return ModelAnswer({"images": []}, None)
+    mime_types = mime_types or ["image/png"] * len(images)
+    parts = [BATCH_DAMAGE_PROMPT.format(count=len(images))]
+    for i, (data, mime_type) in enumerate(zip(images, mime_types), start=1):
+        parts.append(f"Image {i}:")
+        parts.append({"mime_type": mime_type, "data": data})
+
+    text = _generate(
+        model or get_model(model_name), parts, deadline=deadline, cancel=cancel, generation_config=BATCH_GENERATION_CONFIG
+    )
+    return parse_report(text, batch=True)
+
+
+def _hedge_delay() -> Optional[float]:
+    """How long to wait before hedging: the GEMINI_HEDGE_PERCENTILE of recent attempt latency."""
+    if not GEMINI_HEDGE_ENABLED or len(call_latency) < GEMINI_HEDGE_MIN_SAMPLES:
+        return None
+    return call_latency.percentile(GEMINI_HEDGE_PERCENTILE)
+
+
+async def _run_on_pool(fn, **kwargs):
+    """
+    Run a blocking analyze_* function on the model pool. If hedging is enabled
+    and the call is still running after _hedge_delay(), and the hedge budget
+    allows, start an identical second call and use whichever succeeds first;
+    the loser is cancelled (skipped if it has not started, abandoned before its
+    next attempt otherwise). Both legs share one deadline budget, which starts
+    now, so time spent queued for the pool counts against it.
+    """
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+    kwargs["deadline"] = time.monotonic() + retry_policy.deadline
+
+    primary_cancel = threading.Event()
+    primary = loop.run_in_executor(executor, functools.partial(fn, cancel=primary_cancel, **kwargs))
+    hedge_budget.on_call()
+    delay = _hedge_delay()
+    if delay is None:
+        return await primary
+    done, _ = await asyncio.wait({primary}, timeout=delay)
+    if done or not hedge_budget.try_spend():
+        return await primary
+
+    hedge_stats["hedged"] += 1
+    hedge_cancel = threading.Event()
+    hedge = loop.run_in_executor(executor, functools.partial(fn, cancel=hedge_cancel, **kwargs))
+    cancels = {primary: primary_cancel, hedge: hedge_cancel}
+    pending = set(cancels)
+    error = None
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for leg in done:
+            if leg.exception() is None:
+                for loser in pending:
+                    cancels[loser].set()
+                    loser.cancel()
+                if leg is hedge:
+                    hedge_stats["hedge_won"] += 1
+                return leg.result()
+            error = error or leg.exception()
+    raise error
+
+
+async def analyze_damage_bytes_async(
+    image_bytes: bytes,
+    model_name: str = "gemini-1.5-pro",
+    mime_type: str = "image/png",
+    model=None,
+) -> ModelAnswer:
+    """
+    Async variant of analyze_damage_bytes for use inside the event loop.
+    The blocking model call runs on a bounded thread pool (GEMINI_MAX_WORKERS),
+    so concurrent uploads overlap instead of stalling the worker; slow calls
+    may be hedged (see _run_on_pool).
+    """
+    return await _run_on_pool(
+        analyze_damage_bytes, image_bytes=image_bytes, model_name=model_name, mime_type=mime_type, model=model
+    )
+
+
+async def analyze_damage_batch_async(
+    images: List[bytes],
+    model_name: str = "gemini-1.5-pro",
+    mime_types: Optional[List[str]] = None,
+    model=None,
+) -> ModelAnswer:
+    """Async variant of analyze_damage_batch, run on the same bounded pool."""
+    return await _run_on_pool(analyze_damage_batch, images=images, model_name=model_name, mime_types=mime_types, model=model)
 
 
 def analyze_image(image: Union[str, bytes, Image.Image], model_name: str = "gemini-1.5-pro") -> dict:
@@ -62,7 +433,7 @@ def analyze_image(image: Union[str, bytes, Image.Image], model_name: str = "gemi
       - a PIL Image object
       - a file path (str)
       - raw bytes
-    and returns the same parsed dict as analyze_damage_bytes.
+    and returns the parsed answer dict of analyze_damage_bytes.
     """
     # If user passed a PIL Image, convert to bytes
     if isinstance(image, Image.Image):
@@ -71,17 +442,17 @@ def analyze_image(image: Union[str, bytes, Image.Image], model_name: str = "gemi
         image.save(buf, format="PNG")
         buf.seek(0)
         img_bytes = buf.read()
-        return analyze_damage_bytes(img_bytes, model_name=model_name)
+        return analyze_damage_bytes(img_bytes, model_name=model_name).raw
 
     # If path string
     if isinstance(image, str):
         with open(image, "rb") as f:
             img_bytes = f.read()
-        return analyze_damage_bytes(img_bytes, model_name=model_name)
+        return analyze_damage_bytes(img_bytes, model_name=model_name).raw
 
     # If bytes-like
     if isinstance(image, (bytes, bytearray)):
-        return analyze_damage_bytes(bytes(image), model_name=model_name)
+        return analyze_damage_bytes(bytes(image), model_name=model_name).raw
 
     # unknown type
     return {"raw_output": "Unsupported image input type to analyze_image()"}
@@ -0,0 +1,394 @@
+# backend/jobs.py
+import asyncio
+import ipaddress
+import json
+import logging
+import os
+import socket
+import time
+import urllib.parse
+import urllib.request
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List, Optional
+
+from sqlalchemy import delete, select, update
+from starlette.concurrency import run_in_threadpool
+
+from backend.circuit import CircuitOpenError
+from backend.config import (
+    JOB_WORKERS,
+    JOB_RESULT_TTL_SECONDS,
+    JOB_WEBHOOK_TIMEOUT_SECONDS,
+    JOB_WEBHOOK_ALLOWED_HOSTS,
+    JOB_LEASE_SECONDS,
+    JOB_MAX_ATTEMPTS,
+    JOB_RETRY_BACKOFF_SECONDS,
+    JOB_POLL_INTERVAL_MS,
+)
+from backend.database import SessionLocal, AnalysisJob
+from backend.ratelimit import RateLimitTimeout
+
+__all__ = ["JobStore", "JobQueue", "job_store", "job_queue", "validate_callback_url", "post_webhook"]
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[dict], Awaitable[dict]]
+
+# idle workers expire abandoned jobs and purge old results at most this often
+_MAINTENANCE_INTERVAL = 60.0
+
+
+def _host_allowed(host: str, allowed) -> bool:
+    return any(host == a or (a.startswith(".") and host.endswith(a)) for a in allowed)
+
+
+def validate_callback_url(url: str, allowed_hosts=JOB_WEBHOOK_ALLOWED_HOSTS) -> None:
+    """
+    Raise ValueError unless url is an http(s) URL the server may POST to: a host
+    on allowed_hosts if that is set, otherwise a host whose every address is
+    public (not loopback, private, link-local, reserved or multicast). Blocking:
+    resolves the host.
+    """
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme not in ("http", "https"):
+        raise ValueError("callback_url must be an http or https URL")
+    host = (parts.hostname or "").lower()
+    if not host:
+        raise ValueError("callback_url has no host")
+    if allowed_hosts:
+        if not _host_allowed(host, allowed_hosts):
+            raise ValueError(f"callback_url host {host!r} is not allowed")
+        return
+    try:
+        infos = socket.getaddrinfo(host, parts.port or (443 if parts.scheme == "https" else 80), proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError, ValueError) as e:
+        raise ValueError(f"callback_url host {host!r} does not resolve") from e
+    for info in infos:
+        addr = ipaddress.ip_address(info[4][0].split("%", 1)[0])
+        if not addr.is_global or addr.is_multicast:
+            raise ValueError(f"callback_url host {host!r} is not a public address")
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # a redirect could point the POST at an address validate_callback_url would reject
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+_webhook_opener = urllib.request.build_opener(_NoRedirect)
+
+
+def post_webhook(url: str, body: dict, timeout: float = JOB_WEBHOOK_TIMEOUT_SECONDS) -> None:
+    """POST a JSON body to url (re-validated, redirects not followed); failures are logged, not raised."""
+    try:
+        validate_callback_url(url)
+    except ValueError as e:
+        logger.warning("webhook to %s refused: %s", url, e)
+        return
+    req = urllib.request.Request(
+        url,
+        data=json.dumps(body).encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    try:
+        with _webhook_opener.open(req, timeout=timeout) as resp:
+            resp.read()
+    except Exception as e:
+        logger.warning("webhook to %s failed: %s", url, e)
+
+
+def _job_view(job: AnalysisJob) -> dict:
+    out = {"job_id": job.id, "status": job.status, "attempts": job.attempts}
+    if job.result_json is not None:
+        out["analysis"] = json.loads(job.result_json)
+    if job.error is not None:
+        out["error"] = job.error
+    return out
+
+
+class JobStore:
+    """
+    Durable job table (analysis_job) in the application database.
+
+    A job is claimable while it is queued, or running with an expired lease,
+    and has attempts left. claim() takes the oldest claimable job with a single
+    UPDATE ... WHERE id = (SELECT ...) RETURNING statement; SQLite runs it under
+    its write lock, so concurrent worker processes never claim the same job
+    twice within a lease. A worker that dies simply lets its lease run out and
+    the job is picked up again: processing is at-least-once.
+    """
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        lease_seconds: float = JOB_LEASE_SECONDS,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+        retry_backoff: float = JOB_RETRY_BACKOFF_SECONDS,
+    ):
+        self._session_factory = session_factory
+        self._lease = timedelta(seconds=lease_seconds)
+        self._max_attempts = max_attempts
+        self._retry_backoff = retry_backoff
+
+    @property
+    def lease_seconds(self) -> float:
+        return self._lease.total_seconds()
+
+    def enqueue(self, payload: dict, callback_url: Optional[str] = None) -> str:
+        job_id = uuid.uuid4().hex
+        with self._session_factory() as db:
+            db.add(AnalysisJob(
+                id=job_id,
+                status="queued",
+                payload=json.dumps(payload),
+                callback_url=callback_url,
+                attempts=0,
+                max_attempts=self._max_attempts,
+                visible_at=datetime.utcnow(),
+            ))
+            db.commit()
+        return job_id
+
+    def claim(self, owner: str) -> Optional[dict]:
+        """Lease the next claimable job to owner; returns {job_id, payload, attempts, callback_url} or None."""
+        now = datetime.utcnow()
+        candidate = (
+            select(AnalysisJob.id)
+            .where(
+                AnalysisJob.status.in_(("queued", "running")),
+                AnalysisJob.visible_at <= now,
+                AnalysisJob.attempts < AnalysisJob.max_attempts,
+            )
+            .order_by(AnalysisJob.visible_at)
+            .limit(1)
+            .scalar_subquery()
+        )
+        stmt = (
+            update(AnalysisJob)
+            .where(AnalysisJob.id == candidate)
+            .values(
+                status="running",
+                lease_owner=owner,
+                attempts=AnalysisJob.attempts + 1,
+                visible_at=now + self._lease,
+            )
+            .returning(AnalysisJob.id, AnalysisJob.payload, AnalysisJob.attempts, AnalysisJob.callback_url)
+            .execution_options(synchronize_session=False)
+        )
+        with self._session_factory() as db:
+            row = db.execute(stmt).first()
+            db.commit()
+        if row is None:
+            return None
+        return {"job_id": row[0], "payload": json.loads(row[1]), "attempts": row[2], "callback_url": row[3]}
+
+    def _update_owned(self, job_id: str, owner: str, **values) -> bool:
+        stmt = (
+            update(AnalysisJob)
+            .where(AnalysisJob.id == job_id, AnalysisJob.lease_owner == owner, AnalysisJob.status == "running")
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        with self._session_factory() as db:
+            updated = db.execute(stmt).rowcount
+            db.commit()
+        return updated > 0
+
+    def extend_lease(self, job_id: str, owner: str) -> bool:
+        """Push the lease of a running job forward; False if owner no longer holds it."""
+        return self._update_owned(job_id, owner, visible_at=datetime.utcnow() + self._lease)
+
+    def complete(self, job_id: str, owner: str, result: dict) -> bool:
+        return self._update_owned(
+            job_id, owner,
+            status="done",
+            result_json=json.dumps(result),
+            error=None,
+            finished_at=datetime.utcnow(),
+        )
+
+    def fail(self, job_id: str, owner: str, attempts: int, error: str) -> str:
+        """Requeue with exponential backoff, or mark failed once attempts are used up. Returns the new status."""
+        now = datetime.utcnow()
+        if attempts >= self._max_attempts:
+            self._update_owned(job_id, owner, status="failed", error=error, finished_at=now)
+            return "failed"
+        delay = self._retry_backoff * (2 ** (attempts - 1))
+        self._update_owned(
+            job_id, owner,
+            status="queued",
+            error=error,
+            lease_owner=None,
+            visible_at=now + timedelta(seconds=delay),
+        )
+        return "queued"
+
+    def defer(self, job_id: str, owner: str, delay: float, error: str) -> bool:
+        """
+        Requeue a job that could not reach the model (breaker open, rate limit)
+        after delay seconds, giving back the attempt its claim took.
+        """
+        return self._update_owned(
+            job_id, owner,
+            status="queued",
+            error=error,
+            lease_owner=None,
+            attempts=AnalysisJob.attempts - 1,
+            visible_at=datetime.utcnow() + timedelta(seconds=delay),
+        )
+
+    def fail_abandoned(self) -> int:
+        """Mark running jobs whose lease expired on their last attempt as failed."""
+        now = datetime.utcnow()
+        stmt = (
+            update(AnalysisJob)
+            .where(
+                AnalysisJob.status == "running",
+                AnalysisJob.visible_at <= now,
+                AnalysisJob.attempts >= AnalysisJob.max_attempts,
+            )
+            .values(status="failed", error="lease expired", finished_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        with self._session_factory() as db:
+            n = db.execute(stmt).rowcount
+            db.commit()
+        return n
+
+    def purge_finished(self, older_than_seconds: float = JOB_RESULT_TTL_SECONDS) -> int:
+        cutoff = datetime.utcnow() - timedelta(seconds=older_than_seconds)
+        stmt = delete(AnalysisJob).where(
+            AnalysisJob.status.in_(("done", "failed")),
+            AnalysisJob.finished_at < cutoff,
+        )
+        with self._session_factory() as db:
+            n = db.execute(stmt).rowcount
+            db.commit()
+        return n
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._session_factory() as db:
+            job = db.get(AnalysisJob, job_id)
+            return _job_view(job) if job is not None else None
+
+
+class JobQueue:
+    """
+    Async front end to a JobStore. Worker tasks claim jobs, run the handler with
+    a lease heartbeat, record the result and fire the job's webhook. Workers can
+    run inside the API process (JOB_WORKERS) or in `python -m backend.worker`;
+    both share the same table.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        workers: int = JOB_WORKERS,
+        poll_interval: float = JOB_POLL_INTERVAL_MS / 1000.0,
+    ):
+        self.store = store
+        self._workers = workers
+        self._poll_interval = poll_interval
+        self._tasks: List[asyncio.Task] = []
+        self._handler: Optional[Handler] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._owner_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self._last_maintenance = 0.0
+
+    def start(self, handler: Handler, workers: Optional[int] = None) -> None:
+        """Start worker tasks on the running event loop."""
+        if self._tasks:
+            return
+        self._handler = handler
+        self._wake = asyncio.Event()
+        count = self._workers if workers is None else workers
+        self._tasks = [asyncio.create_task(self._work(f"{self._owner_prefix}:{n}")) for n in range(count)]
+
+    async def stop(self) -> None:
+        """Cancel workers; jobs they were running are picked up again after their lease expires."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def enqueue(self, payload: dict, callback_url: Optional[str] = None) -> str:
+        job_id = await run_in_threadpool(self.store.enqueue, payload, callback_url)
+        if self._wake is not None:
+            self._wake.set()
+        return job_id
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        return await run_in_threadpool(self.store.get, job_id)
+
+    async def _idle(self) -> None:
+        now = time.monotonic()
+        if now - self._last_maintenance >= _MAINTENANCE_INTERVAL:
+            self._last_maintenance = now
+            try:
+                await run_in_threadpool(self.store.fail_abandoned)
+                await run_in_threadpool(self.store.purge_finished)
+            except Exception:
+                logger.exception("job table maintenance failed")
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout=self._poll_interval)
+        except asyncio.TimeoutError:
+            pass
+        self._wake.clear()
+
+    async def _heartbeat(self, job_id: str, owner: str) -> None:
+        interval = self.store.lease_seconds / 3
+        while True:
+            await asyncio.sleep(interval)
+            if not await run_in_threadpool(self.store.extend_lease, job_id, owner):
+                return
+
+    async def _work(self, owner: str) -> None:
+        while True:
+            try:
+                job = await run_in_threadpool(self.store.claim, owner)
+            except Exception:
+                logger.exception("claiming a job failed")
+                job = None
+            if job is None:
+                await self._idle()
+                continue
+
+            job_id = job["job_id"]
+            heartbeat = asyncio.create_task(self._heartbeat(job_id, owner))
+            status = None
+            try:
+                result = await self._handler(job["payload"])
+                await run_in_threadpool(self.store.complete, job_id, owner, result)
+                status = "done"
+            except asyncio.CancelledError:
+                raise
+            except (CircuitOpenError, RateLimitTimeout) as e:
+                # the model was never called: wait out the outage without using up attempts
+                logger.warning("analysis job %s deferred %.1fs: %s", job_id, e.retry_after, e)
+                try:
+                    await run_in_threadpool(self.store.defer, job_id, owner, max(1.0, e.retry_after), str(e))
+                    status = "queued"
+                except Exception:
+                    logger.exception("deferring job %s failed", job_id)
+            except Exception as e:
+                logger.exception("analysis job %s failed (attempt %d)", job_id, job["attempts"])
+                try:
+                    status = await run_in_threadpool(self.store.fail, job_id, owner, job["attempts"], str(e))
+                except Exception:
+                    # the lease runs out and the job is claimed again
+                    logger.exception("recording failure of job %s failed", job_id)
+            finally:
+                heartbeat.cancel()
+
+            if job.get("callback_url") and status in ("done", "failed"):
+                try:
+                    await run_in_threadpool(post_webhook, job["callback_url"], await self.get(job_id))
+                except Exception:
+                    logger.exception("webhook for job %s failed", job_id)
+
+
+# process-wide store and queue used by the API and backend.worker
+job_store = JobStore()
+job_queue = JobQueue(job_store)
@@ -1,33 +1,83 @@
 # backend/main.py
+import asyncio
+import logging
 import os
-import uuid
-import re
 import json
 from io import BytesIO
-from fastapi import FastAPI, UploadFile, File, Depends
+from typing import List, NamedTuple, Optional
+import base64
+import csv
+import io
+import zlib
+from datetime import datetime
+from fastapi import FastAPI, UploadFile, File, Depends, HTTPException, Query, Response
+from starlette.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from dotenv import load_dotenv
 from PIL import Image
-import google.generativeai as genai
 from fastapi.staticfiles import StaticFiles
 import os
 
 
 # local imports
-from backend.database import SessionLocal, engine, Base, Analysis, get_db
-import backend.gemini_client as gemini_client
-from sqlalchemy.orm import Session
+from backend.database import SessionLocal, AsyncSessionLocal, Analysis, AnalysisRaw, get_async_db, async_engine, init_db
+from backend.config import (
+    DEDUP_TTL_SECONDS,
+    PHASH_MODE,
+    PHASH_MAX_DISTANCE,
+    WRITE_WAIT_FOR_COMMIT,
+    BATCH_MAX_FILES,
+    BATCH_CONCURRENCY,
+    PACKED_MAX_IMAGES,
+    UPLOAD_MAX_BYTES,
+)
+from backend.dedup import lookup_digest, remember_digest
+from backend.raw_store import decode_raw, remember_raw
+from backend.phash import perceptual_hash, fingerprint_index
+from backend.normalize import convert_costs, damage_type_text, normalize_analysis, normalize_report
+from backend.schema import split_report
+from backend.preprocess import PreparedImage, prepare_for_model
+from backend.uploads import (
+    MULTIPART_OVERHEAD_BYTES,
+    BodySizeLimit,
+    UploadTooLarge,
+    ingest_upload,
+    finalize_upload,
+    discard_upload,
+)
+from backend.writer import analysis_writer
+from backend.jobs import job_queue, validate_callback_url
+from backend.model_backends import get_backend
+from backend.circuit import CircuitOpenError
+from backend.ratelimit import RateLimitTimeout
+from backend.retry import DeadlineExceeded
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 
 load_dotenv()
-API_KEY = os.getenv("GEMINI_API_KEY")
-if not API_KEY:
-    raise RuntimeError("GEMINI_API_KEY missing in .env")
 
-genai.configure(api_key=API_KEY)
+logger = logging.getLogger(__name__)
+
+# Gemini by default; MODEL_BACKEND=fake runs the whole pipeline offline
+model_backend = get_backend()
 
 app = FastAPI()
 
+
+def _body_limit(path):
+    """Largest request body accepted on path (None: no limit)."""
+    if path.startswith("/analyze/batch"):
+        return BATCH_MAX_FILES * (UPLOAD_MAX_BYTES + MULTIPART_OVERHEAD_BYTES)
+    if path.startswith("/analyze"):
+        return UPLOAD_MAX_BYTES + MULTIPART_OVERHEAD_BYTES
+    return None
+
+
+# Reject oversized bodies before multipart parsing spools them (added first, so CORS wraps its 413s)
+app.add_middleware(BodySizeLimit, limit_for=_body_limit)
+
 # Allow your frontend origin
 app.add_middleware(
     CORSMiddleware,
@@ -35,196 +85,578 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+@app.on_event("startup")
+def _start_writer():
+    analysis_writer.start()
+
+@app.on_event("startup")
+async def _start_job_workers():
+    job_queue.start(process_job)
+
+@app.on_event("shutdown")
+async def _stop_job_workers():
+    await job_queue.stop()
+
+@app.on_event("shutdown")
+def _shutdown_model_pool():
+    model_backend.close()
+
+@app.on_event("shutdown")
+def _flush_writer():
+    analysis_writer.stop()
+
+@app.on_event("shutdown")
+async def _close_async_engine():
+    await async_engine.dispose()
+
 # make sure uploads dir exists and mount it for static serving
 UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
+# partial uploads live outside the served directory until finalized
+UPLOAD_TMP_DIR = ".upload-tmp"
+os.makedirs(UPLOAD_TMP_DIR, exist_ok=True)
 app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
 
 # helpers
-def _parse_number_from_string(s):
-    """Extract positive float values from string."""
-    if s is None:
-        return 0.0
-    if isinstance(s, (int, float)):
-        return abs(float(s))
-    s = str(s)
-    s_clean = s.replace(",", "")
-    nums = re.findall(r"\d+(?:\.\d+)?", s_clean)  # 🚨 removed the "-" sign
-    if not nums:
-        return 0.0
+def _safe_perceptual_hash(image):
+    """pHash of the decoded upload, or None if hashing fails."""
     try:
-        values = [float(n) for n in nums]
-        if len(values) >= 2:
-            return sum(values[:2]) / 2.0
-        return values[0]
-    except:
-        return 0.0
+        return perceptual_hash(image)
+    except Exception:
+        return None
 
 
-def _normalize_analysis(raw):
-    """
-    Accept parsed JSON from Gemini (various shapes) and return a stable dict:
-    {
-      damage_type: string or list,
-      location: string,
-      cost_inr: float,
-      cost_usd: float,
-      cost_yen: float,
-      uploadedImage: (populated later),
-      notes: string
+def _analysis_row_to_result(row):
+    """Rebuild a normalized-style dict from a stored Analysis row."""
+    return {
+        "damage_type": row.damage_type,
+        "location": row.location,
+        "cost_inr": row.cost_inr,
+        "cost_usd": row.cost_usd,
+        "cost_yen": row.cost_yen,
+        "costs": convert_costs(row.cost_usd),
+        "notes": "",
+        "uploadedImage": row.image_path,
     }
+
+class _StagedUpload(NamedTuple):
+    """An upload that missed the duplicate checks and is ready for the model."""
+    unique_name: str
+    prepared: PreparedImage
+    digest: str
+    phash: Optional[int]
+    duplicate_of: Optional[dict]
+
+
+async def _stage_upload(file, force, db):
     """
-    if not isinstance(raw, dict):
-        return {
-            "damage_type": "Unknown",
-            "location": "",
-            "cost_inr": 0.0,
-            "cost_usd": 0.0,
-            "cost_yen": 0.0,
-            "notes": str(raw)
-        }
-
-    # If Gemini provided the exact structure:
-    damages = raw.get("damages") or raw.get("damage") or []
-    damage_types = []
-    locations = []
+    Ingest one upload and run the exact and near-duplicate checks.
+    Returns (cached_result, None) when an earlier analysis answers it, otherwise
+    (None, staged) with the file kept under its public name, after ending the
+    session's read transaction. Raises UploadTooLarge.
+    """
+    # Stream to a temp file, hashing and sniffing the type on the way
+    upload = await ingest_upload(file, UPLOAD_TMP_DIR)
+    try:
+        digest = upload.digest
+        if not force:
+            cached = await db.run_sync(lookup_digest, digest, DEDUP_TTL_SECONDS)
+            if cached is not None:
+                cached["cached"] = True
+                return cached, None
+
+        # Decode once: oriented, downscaled copy for the model and for hashing
+        prepared = await run_in_threadpool(prepare_for_model, upload.temp_path)
+
+        # Near-duplicate check on the perceptual hash
+        phash = None
+        duplicate_of = None
+        if PHASH_MODE in ("flag", "reuse") and prepared.image is not None:
+            phash = await run_in_threadpool(_safe_perceptual_hash, prepared.image)
+        if phash is not None:
+            await db.run_sync(fingerprint_index.sync)
+            match = fingerprint_index.nearest(phash, PHASH_MAX_DISTANCE)
+            if match is not None:
+                distance, match_id = match
+                duplicate_of = {"analysis_id": match_id, "distance": distance}
+                earlier = await db.get(Analysis, match_id) if (PHASH_MODE == "reuse" and not force) else None
+                if earlier is not None and await db.run_sync(_reusable_row, earlier):
+                    result = _analysis_row_to_result(earlier)
+                    await db.run_sync(remember_digest, digest, earlier.id, result)
+                    await db.commit()
+                    result["duplicate_of"] = duplicate_of
+                    result["cached"] = True
+                    return result, None
+
+        # end the read transaction so no pooled connection is held during the model call
+        await db.rollback()
+
+        # Keep the file under its public name
+        unique_name = await finalize_upload(upload, UPLOAD_DIR)
+        upload = None
+        return None, _StagedUpload(unique_name, prepared, digest, phash, duplicate_of)
+    finally:
+        if upload is not None:
+            await discard_upload(upload)
+
+
+def _normalize_answer(answer):
+    """Normalize a parsed model answer: from its typed report when it validated, else leniently."""
+    if answer.report is not None:
+        return normalize_report(answer.report)
+    return normalize_analysis(answer.raw)
+
+
+async def _analyze_staged(staged):
+    """Send a staged upload to Gemini and return (raw, normalized)."""
+    answer = await model_backend.analyze_async(staged.prepared.data, mime_type=staged.prepared.mime_type)
+    return answer.raw, _attach_upload(staged, _normalize_answer(answer))
+
+
+def _attach_upload(staged, normalized):
+    # attach uploadedImage (relative path)
+    normalized["uploadedImage"] = f"/uploads/{staged.unique_name}"
+    if staged.duplicate_of is not None:
+        normalized["duplicate_of"] = staged.duplicate_of
+    return normalized
+
+
+def _analysis_entry(normalized):
+    """Build the Analysis row for a normalized result (DB requires non-null floats/strings)."""
+    damage_str = damage_type_text(normalized["damage_type"])
+    location_str = normalized.get("location", "") or ""
+    cost_inr = float(normalized.get("cost_inr") or 0.0)
+    cost_usd = float(normalized.get("cost_usd") or 0.0)
+    cost_yen = float(normalized.get("cost_yen") or 0.0)
+
+    return Analysis(
+        image_path=normalized["uploadedImage"],
+        damage_type=damage_str,
+        location=location_str,
+        cost_inr=cost_inr,
+        cost_usd=cost_usd,
+        cost_yen=cost_yen
+    )
+
+
+def _reusable(raw):
+    """Whether a model answer may be served again for the same or a similar photo."""
+    # unparsed model output, or an empty answer, is not worth reusing
+    return isinstance(raw, dict) and bool(raw) and "raw_output" not in raw
+
+
+def _reusable_row(db, row):
+    """
+    Whether a stored Analysis row may answer a near-duplicate upload: decided
+    from its stored model answer, or for rows older than analysis_raw, from
+    whether anything was recognised at all.
+    """
+    stored = db.get(AnalysisRaw, row.id)
+    if stored is None:
+        return not (row.damage_type == "Unknown" and not row.cost_usd)
+    try:
+        return _reusable(decode_raw(stored.codec, stored.payload))
+    except (ValueError, zlib.error):
+        return False
 
-    if isinstance(damages, list) and len(damages) > 0:
-        for d in damages:
-            part = d.get("part") if isinstance(d, dict) else None
-            dtype = d.get("damage_type") if isinstance(d, dict) else None
-            if dtype and part:
-                damage_types.append(f"{dtype} ({part})")
-                locations.append(part)
-            elif dtype:
-                damage_types.append(dtype)
-            elif part:
-                locations.append(part)
-    else:
-        # fallback: look for simple fields
-        dtype_field = raw.get("damage_type") or raw.get("damage")
-        if dtype_field:
-            if isinstance(dtype_field, list):
-                damage_types = dtype_field
-            else:
-                damage_types = [str(dtype_field)]
-
-        # maybe a direct location key
-        loc = raw.get("location") or raw.get("part")
-        if loc:
-            if isinstance(loc, list):
-                locations.extend(loc)
-            else:
-                locations.append(str(loc))
-
-    # build damage_type and location strings
-    damage_type_out = damage_types if damage_types else (raw.get("damage_type") or "Unknown")
-    if isinstance(damage_type_out, list) and len(damage_type_out) == 1:
-        damage_type_out = damage_type_out[0]  # single string is friendlier
-
-    location_out = ", ".join(locations) if locations else (raw.get("location") or "")
-
-    # costs: try various keys
-    est = raw.get("estimated_cost") or raw.get("estimatedCosts") or {}
-    usd_raw = None; inr_raw = None; jpy_raw = None
-
-    if isinstance(est, dict):
-        usd_raw = est.get("usd") or est.get("USD") or est.get("dollars")
-        inr_raw = est.get("inr") or est.get("INR")
-        jpy_raw = est.get("jpy") or est.get("JPY") or est.get("yen")
-    else:
-        # maybe top-level cost fields
-        usd_raw = raw.get("cost_usd") or raw.get("costUSD") or raw.get("usd")
-        inr_raw = raw.get("cost_inr") or raw.get("costINR") or raw.get("inr")
-        jpy_raw = raw.get("cost_yen") or raw.get("costJPY") or raw.get("jpy")
 
-    cost_usd = _parse_number_from_string(usd_raw)
-    cost_inr = _parse_number_from_string(inr_raw)
-    cost_yen = _parse_number_from_string(jpy_raw)
+def _index_hook(staged, raw, normalized):
+    """
+    on_insert callback recording the raw answer of a new Analysis row, and its
+    digest and fingerprint when the answer is reusable.
+    """
+    reusable = _reusable(raw)
+
+    def _index_entry(session, row, record_digest=True):
+        remember_raw(session, row.id, raw, model_backend.prompt_version, model_backend.model_name)
+        if not reusable:
+            return
+        if record_digest:
+            remember_digest(session, staged.digest, row.id, normalized)
+        if staged.phash is not None:
+            fingerprint_index.remember(session, row.id, staged.phash)
+
+    return _index_entry
+
+
+def _remove_upload(unique_name):
+    """Delete a finalized upload that ended up without an Analysis row."""
+    try:
+        os.remove(os.path.join(UPLOAD_DIR, unique_name))
+    except FileNotFoundError:
+        pass
 
-    notes = raw.get("notes") or raw.get("note") or raw.get("raw_output") or ""
 
+def _job_payload(staged):
+    """JSON-safe description of a staged upload; the worker re-reads the saved file."""
     return {
-        "damage_type": damage_type_out,
-        "location": location_out,
-        "cost_inr": cost_inr,
-        "cost_usd": cost_usd,
-        "cost_yen": cost_yen,
-        "notes": notes
+        "unique_name": staged.unique_name,
+        "digest": staged.digest,
+        "phash": staged.phash,
+        "duplicate_of": staged.duplicate_of,
     }
 
+
+async def process_job(payload):
+    """Job handler for mode=async (API workers and backend.worker): the model call and DB write of /analyze/."""
+    prepared = await run_in_threadpool(prepare_for_model, os.path.join(UPLOAD_DIR, payload["unique_name"]))
+    staged = _StagedUpload(payload["unique_name"], prepared, payload["digest"], payload["phash"], payload["duplicate_of"])
+    raw, normalized = await _analyze_staged(staged)
+    committed = analysis_writer.submit(_analysis_entry(normalized), on_insert=_index_hook(staged, raw, normalized))
+    await asyncio.wrap_future(committed)
+    return normalized
+
+
 # API endpoints
 @app.post("/analyze/")
-async def analyze(file: UploadFile = File(...), db: Session = Depends(get_db)):
+async def analyze(
+    file: UploadFile = File(...),
+    force: bool = False,
+    mode: str = Query("sync", pattern="^(sync|async)$"),
+    callback_url: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
     """
     Accepts an image upload, saves file, queries Gemini, normalizes response,
     saves a DB row, and returns {"analysis": <normalized dict>}.
+    Byte-identical re-uploads are answered from the content-hash index
+    unless force=true is passed. Near-duplicates (perceptual hash within
+    PHASH_MAX_DISTANCE) are flagged with `duplicate_of`, or answered from the
+    earlier analysis when PHASH_MODE=reuse.
+    With mode=async the model call is queued instead: the response is 202
+    {"job_id", "status", "status_url"}; poll /jobs/{job_id} or pass
+    callback_url to have the finished job POSTed to you.
     """
+    if mode == "async" and callback_url:
+        try:
+            await run_in_threadpool(validate_callback_url, callback_url)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
     try:
-        contents = await file.read()
-        # Save file
-        ext = os.path.splitext(file.filename)[1] or ".png"
-        unique_name = f"{uuid.uuid4().hex}{ext}"
-        save_path = os.path.join(UPLOAD_DIR, unique_name)
-        with open(save_path, "wb") as f:
-            f.write(contents)
-
-        # Send to Gemini and parse
-        raw = gemini_client.analyze_damage_bytes(contents)
-        normalized = _normalize_analysis(raw)
-
-        # attach uploadedImage (relative path)
-        normalized["uploadedImage"] = f"/uploads/{unique_name}"
-
-        # Save to DB (DB requires non-null floats/strings)
-        damage_str = normalized["damage_type"] if isinstance(normalized["damage_type"], str) else (", ".join(normalized["damage_type"]) if isinstance(normalized["damage_type"], list) else "Unknown")
-        location_str = normalized.get("location", "") or ""
-        cost_inr = float(normalized.get("cost_inr") or 0.0)
-        cost_usd = float(normalized.get("cost_usd") or 0.0)
-        cost_yen = float(normalized.get("cost_yen") or 0.0)
-
-        entry = Analysis(
-            image_path=normalized["uploadedImage"],
-            damage_type=damage_str,
-            location=location_str,
-            cost_inr=cost_inr,
-            cost_usd=cost_usd,
-            cost_yen=cost_yen
-        )
-        db.add(entry)
-        db.commit()
-        db.refresh(entry)
+        try:
+            cached, staged = await _stage_upload(file, force, db)
+        except UploadTooLarge as e:
+            return JSONResponse(status_code=413, content={"analysis": {"error": str(e)}})
+        if cached is not None:
+            return {"analysis": cached}
+
+        if mode == "async":
+            job_id = await job_queue.enqueue(_job_payload(staged), callback_url=callback_url)
+            return JSONResponse(
+                status_code=202,
+                content={"job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"},
+            )
+
+        raw, normalized = await _analyze_staged(staged)
+        entry = _analysis_entry(normalized)
+
+        # Batched write-behind insert; optionally wait for the batch commit
+        committed = analysis_writer.submit(entry, on_insert=_index_hook(staged, raw, normalized))
+        if WRITE_WAIT_FOR_COMMIT:
+            await asyncio.wrap_future(committed)
 
         # Return normalized analysis object (frontend expects it inside `analysis`)
         return {"analysis": normalized}
 
+    except CircuitOpenError as e:
+        return JSONResponse(
+            status_code=503,
+            content={"analysis": {"error": str(e)}},
+            headers={"Retry-After": str(max(1, int(e.retry_after)))},
+        )
+    except RateLimitTimeout as e:
+        return JSONResponse(status_code=429, content={"analysis": {"error": str(e)}})
+    except DeadlineExceeded as e:
+        return JSONResponse(status_code=504, content={"analysis": {"error": str(e)}})
     except Exception as e:
         return {"analysis": {"error": str(e)}}
 
 
-# History endpoint returns saved rows (including image_path)
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status of an async analysis job; "analysis" is present once it is done."""
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="unknown job")
+    return job
+
+
+def _claim_estimate(results, repeats=()):
+    """
+    Combine per-image analyses of one claim into totals. Indices in repeats are
+    copies of another upload of the same photo and are not counted again.
+    """
+    analysed = [r for i, r in enumerate(results) if "error" not in r and i not in repeats]
+    damage_types = []
+    locations = []
+    for r in analysed:
+        dtype = r.get("damage_type")
+        for d in (dtype if isinstance(dtype, list) else [dtype]):
+            if d and d != "Unknown" and d not in damage_types:
+                damage_types.append(d)
+        for loc in (r.get("location") or "").split(", "):
+            if loc and loc not in locations:
+                locations.append(loc)
+    # total in the base currency, converted once so all currencies agree
+    costs = convert_costs(sum(float(r.get("cost_usd") or 0.0) for r in analysed))
+    return {
+        "images": len(results),
+        "analysed": len(analysed),
+        "damage_type": damage_types,
+        "location": ", ".join(locations),
+        "cost_inr": costs.get("INR", 0.0),
+        "cost_usd": costs.get("USD", 0.0),
+        "cost_yen": costs.get("JPY", 0.0),
+        "costs": costs,
+    }
+
+
+@app.post("/analyze/batch")
+async def analyze_batch(
+    files: List[UploadFile] = File(...),
+    force: bool = False,
+    packed: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Analyse all photos of one claim. Uploads are staged concurrently and at most
+    BATCH_CONCURRENCY model calls run at once, so total latency tracks the
+    slowest image. With packed=true, up to PACKED_MAX_IMAGES photos share one
+    multimodal request instead. New Analysis rows are written in a single
+    transaction.
+    Returns {"results": [{"filename", "analysis"}...], "claim": <combined estimate>}.
+    """
+    if len(files) > BATCH_MAX_FILES:
+        raise HTTPException(status_code=413, detail=f"at most {BATCH_MAX_FILES} files per batch")
+
+    limit = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def _stage(file):
+        async with limit:
+            try:
+                # each task needs its own session; AsyncSession is not shareable across tasks
+                async with AsyncSessionLocal() as session:
+                    return await _stage_upload(file, force, session)
+            except Exception as e:
+                return {"error": str(e)}, None
+
+    staged_all = await asyncio.gather(*(_stage(f) for f in files))
+    results = [cached for cached, _ in staged_all]
+
+    # the same photo twice in one claim is analysed and recorded once; repeats copy its result
+    todo = []
+    first_by_digest = {}
+    repeats = {}
+    for i, (_, staged) in enumerate(staged_all):
+        if staged is None:
+            continue
+        if staged.digest in first_by_digest:
+            repeats[i] = first_by_digest[staged.digest]
+        else:
+            first_by_digest[staged.digest] = i
+            todo.append((i, staged))
+    inserts = {}
+
+    async def _single(i, staged):
+        async with limit:
+            try:
+                raw, normalized = await _analyze_staged(staged)
+            except Exception as e:
+                results[i] = {"error": str(e)}
+                return
+        results[i] = normalized
+        inserts[i] = (_analysis_entry(normalized), _index_hook(staged, raw, normalized), staged.digest)
+
+    async def _packed(chunk):
+        async with limit:
+            try:
+                answer = await model_backend.analyze_batch_async(
+                    [staged.prepared.data for _, staged in chunk],
+                    mime_types=[staged.prepared.mime_type for _, staged in chunk],
+                )
+            except Exception as e:
+                for i, _ in chunk:
+                    results[i] = {"error": str(e)}
+                return
+        for (i, staged), item in zip(chunk, split_report(answer, len(chunk))):
+            if not item.raw:
+                # left out of the packed answer: nothing to record or reuse
+                results[i] = {"error": "the model returned no analysis for this image"}
+                await run_in_threadpool(_remove_upload, staged.unique_name)
+                continue
+            normalized = _attach_upload(staged, _normalize_answer(item))
+            results[i] = normalized
+            inserts[i] = (_analysis_entry(normalized), _index_hook(staged, item.raw, normalized), staged.digest)
+
+    if packed:
+        chunks = [todo[n:n + PACKED_MAX_IMAGES] for n in range(0, len(todo), PACKED_MAX_IMAGES)]
+        await asyncio.gather(*(_packed(chunk) for chunk in chunks))
+    else:
+        await asyncio.gather(*(_single(i, staged) for i, staged in todo))
+
+    pending = [inserts[i] for i in sorted(inserts)]
+
+    def _insert_all(session):
+        session.add_all(entry for entry, _, _ in pending)
+        session.flush()
+        # image_digest is keyed by digest: one entry per digest per transaction
+        recorded = set()
+        for entry, hook, digest in pending:
+            hook(session, entry, record_digest=digest not in recorded)
+            recorded.add(digest)
+
+    if pending:
+        try:
+            await db.run_sync(_insert_all)
+            await db.commit()
+        except Exception as e:
+            logger.exception("saving batch analyses failed")
+            await db.rollback()
+            for i in inserts:
+                results[i] = {"error": f"could not save analysis: {e}"}
+                await run_in_threadpool(_remove_upload, staged_all[i][1].unique_name)
+
+    for i, first in repeats.items():
+        await run_in_threadpool(_remove_upload, staged_all[i][1].unique_name)
+        results[i] = dict(results[first])
+        if "error" not in results[i]:
+            results[i]["cached"] = True
+
+    return {
+        "results": [{"filename": f.filename, "analysis": r} for f, r in zip(files, results)],
+        "claim": _claim_estimate(results, repeats),
+    }
+
+
+def _encode_cursor(created_at, row_id):
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="invalid cursor")
+
+
+def _history_row(r):
+    return {
+        "id": r.id,
+        "image_path": r.image_path,   # e.g. /uploads/abcd.png
+        "damage_type": r.damage_type,
+        "location": r.location,
+        "cost_inr": r.cost_inr,
+        "cost_usd": r.cost_usd,
+        "cost_yen": r.cost_yen,
+        "created_at": r.created_at.isoformat()
+    }
+
+
+# History endpoint returns saved rows (including image_path), newest first.
+# Keyset-paginated on (created_at, id): pass the X-Next-Cursor header of one
+# page as ?cursor= to get the next; the header is absent on the last page.
 @app.get("/history")
-def get_history(db: Session = Depends(get_db)):
-    rows = db.query(Analysis).order_by(Analysis.created_at.desc()).all()
-    out = []
-    for r in rows:
-        out.append({
-            "id": r.id,
-            "image_path": r.image_path,   # e.g. /uploads/abcd.png
-            "damage_type": r.damage_type,
-            "location": r.location,
-            "cost_inr": r.cost_inr,
-            "cost_usd": r.cost_usd,
-            "cost_yen": r.cost_yen,
-            "created_at": r.created_at.isoformat()
-        })
-    return out
-
-
-# Create tables once at startup if not present
-Base.metadata.create_all(bind=engine)
+async def get_history(
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: str = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    stmt = select(Analysis)
+    if cursor:
+        after_created, after_id = _decode_cursor(cursor)
+        stmt = stmt.where(tuple_(Analysis.created_at, Analysis.id) < tuple_(after_created, after_id))
+    # fetch one extra row to learn whether another page exists
+    stmt = stmt.order_by(Analysis.created_at.desc(), Analysis.id.desc()).limit(limit + 1)
+    rows = (await db.execute(stmt)).scalars().all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(rows[-1].created_at, rows[-1].id)
+    return [_history_row(r) for r in rows]
+
+
+_EXPORT_COLUMNS = ["id", "image_path", "damage_type", "location", "cost_inr", "cost_usd", "cost_yen", "created_at"]
+_EXPORT_BATCH = 1000
+_EXPORT_CHUNK_BYTES = 64 * 1024
+
+
+def _export_rows(since, until):
+    """Yield history dicts oldest first through a server-side cursor, in batches of _EXPORT_BATCH."""
+    db = SessionLocal()
+    try:
+        q = db.query(Analysis).execution_options(stream_results=True)
+        if since is not None:
+            q = q.filter(Analysis.created_at >= since)
+        if until is not None:
+            q = q.filter(Analysis.created_at < until)
+        for r in q.order_by(Analysis.created_at, Analysis.id).yield_per(_EXPORT_BATCH):
+            yield _history_row(r)
+            db.expunge(r)  # keep the identity map from growing with the export
+    finally:
+        db.close()
+
+
+def _encode_export(rows, fmt):
+    """Turn history dicts into NDJSON or CSV text chunks of roughly _EXPORT_CHUNK_BYTES."""
+    buf = io.StringIO()
+    writer = None
+    if fmt == "csv":
+        writer = csv.DictWriter(buf, fieldnames=_EXPORT_COLUMNS)
+        writer.writeheader()
+    for row in rows:
+        if writer is not None:
+            writer.writerow(row)
+        else:
+            buf.write(json.dumps(row))
+            buf.write("\n")
+        if buf.tell() >= _EXPORT_CHUNK_BYTES:
+            yield buf.getvalue().encode()
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode()
+
+
+def _gzip_stream(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip container
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+# Full history export for reconciliation jobs. Rows are streamed oldest first,
+# so memory stays constant however large the table is.
+@app.get("/history/export")
+def export_history(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    since: datetime = None,
+    until: datetime = None,
+    gzip: bool = True,
+):
+    body = _encode_export(_export_rows(since, until), format)
+    filename = f"analysis-export.{format}"
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/csv"
+    if gzip:
+        body = _gzip_stream(body)
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+# Create tables (and any new indexes) once at startup if not present
+init_db()
 
 os.makedirs("uploads", exist_ok=True)
 app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
@@ -0,0 +1,41 @@
+# backend/metrics.py
+import collections
+import threading
+from typing import Optional
+
+__all__ = ["LatencyWindow"]
+
+
+class LatencyWindow:
+    """Rolling window of the last `size` latencies (seconds) with outcome counts."""
+
+    def __init__(self, size: int = 1000):
+        self._samples = collections.deque(maxlen=size)
+        self._outcomes = collections.Counter()
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, outcome: str = "ok") -> None:
+        with self._lock:
+            self._samples.append(seconds)
+            self._outcomes[outcome] += 1
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """pct in [0, 100]; None until something has been recorded."""
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+        return ordered[idx]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def summary(self) -> dict:
+        return {
+            "count": len(self._samples),
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "outcomes": dict(self._outcomes),
+        }
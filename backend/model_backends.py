@@ -0,0 +1,90 @@
+# backend/model_backends.py
+import threading
+from typing import List, Optional, Protocol
+
+from backend.config import MODEL_BACKEND
+from backend.schema import ModelAnswer
+
+__all__ = ["ModelBackend", "GeminiBackend", "get_backend"]
+
+
+class ModelBackend(Protocol):
+    """What the API needs from a damage-assessment model; answers come back parsed (schema.ModelAnswer)."""
+
+    name: str
+    model_name: str
+    prompt_version: str
+
+    def analyze(self, image_bytes: bytes, mime_type: str = "image/png") -> ModelAnswer: ...
+
+    async def analyze_async(self, image_bytes: bytes, mime_type: str = "image/png") -> ModelAnswer: ...
+
+    def analyze_batch(self, images: List[bytes], mime_types: Optional[List[str]] = None) -> ModelAnswer: ...
+
+    async def analyze_batch_async(self, images: List[bytes], mime_types: Optional[List[str]] = None) -> ModelAnswer: ...
+
+    def close(self) -> None: ...
+
+
+class GeminiBackend:
+    """
+    Google Gemini through backend.gemini_client (limiter, retries, breaker,
+    hedging). With fake=True every call is given backend.fake_model's offline
+    model instead of the real one, so nothing but the final generate_content
+    call changes and no API key is needed.
+    """
+
+    def __init__(self, model_name: str = "gemini-1.5-pro", api_key: Optional[str] = None, fake: bool = False):
+        import backend.gemini_client as gemini_client
+
+        self._client = gemini_client
+        self.name = "fake" if fake else "gemini"
+        self.model_name = "fake" if fake else model_name
+        self.prompt_version = gemini_client.PROMPT_VERSION
+        self._model = None
+        if fake:
+            from backend.fake_model import fake_model
+
+            self._model = fake_model()
+        else:
+            gemini_client.configure(api_key)  # fail at startup, not on the first upload
+
+    def analyze(self, image_bytes: bytes, mime_type: str = "image/png") -> ModelAnswer:
+        return self._client.analyze_damage_bytes(
+            image_bytes, model_name=self.model_name, mime_type=mime_type, model=self._model
+        )
+
+    async def analyze_async(self, image_bytes: bytes, mime_type: str = "image/png") -> ModelAnswer:
+        return await self._client.analyze_damage_bytes_async(
+            image_bytes, model_name=self.model_name, mime_type=mime_type, model=self._model
+        )
+
+    def analyze_batch(self, images: List[bytes], mime_types: Optional[List[str]] = None) -> ModelAnswer:
+        return self._client.analyze_damage_batch(
+            images, model_name=self.model_name, mime_types=mime_types, model=self._model
+        )
+
+    async def analyze_batch_async(self, images: List[bytes], mime_types: Optional[List[str]] = None) -> ModelAnswer:
+        return await self._client.analyze_damage_batch_async(
+            images, model_name=self.model_name, mime_types=mime_types, model=self._model
+        )
+
+    def close(self) -> None:
+        self._client.shutdown_executor(wait=False)
+
+
+_backend: Optional[ModelBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> ModelBackend:
+    """The process-wide backend selected by MODEL_BACKEND ("gemini" or "fake")."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if MODEL_BACKEND in ("gemini", "fake"):
+                    _backend = GeminiBackend(fake=MODEL_BACKEND == "fake")
+                else:
+                    raise RuntimeError(f"unknown MODEL_BACKEND {MODEL_BACKEND!r}")
+    return _backend
@@ -0,0 +1,233 @@
+# backend/normalize.py
+import json
+import re
+
+from backend.cost_parser import parse_cost
+from backend.fx import fx_table
+
+__all__ = [
+    "parse_model_text",
+    "describe_damage",
+    "cost_fields",
+    "damage_type_text",
+    "base_cost",
+    "convert_costs",
+    "normalize_analysis",
+    "normalize_report",
+    "split_batch",
+]
+
+
+def parse_model_text(text: str) -> dict:
+    """Parse the model's JSON answer; {'raw_output': text} if it is not JSON."""
+    # Try direct JSON parse
+    try:
+        return json.loads(text)
+    except Exception:
+        # Fallback: extract first JSON object-like substring
+        m = re.search(r"\{[\s\S]*\}", text)
+        if m:
+            try:
+                return json.loads(m.group(0))
+            except Exception:
+                return {"raw_output": text}
+        else:
+            return {"raw_output": text}
+
+
+def _parse_number_from_string(s):
+    """Midpoint of a cost field ("150-250" -> 200.0); 0.0 if there is no amount."""
+    return parse_cost(s).mid
+
+
+def describe_damage(raw: dict):
+    """(damage_type, location, notes) of a parsed model answer; damage_type is a string or list."""
+    # If Gemini provided the exact structure:
+    damages = raw.get("damages") or raw.get("damage") or []
+    damage_types = []
+    locations = []
+
+    if isinstance(damages, list) and len(damages) > 0:
+        for d in damages:
+            part = d.get("part") if isinstance(d, dict) else None
+            dtype = d.get("damage_type") if isinstance(d, dict) else None
+            if dtype and part:
+                damage_types.append(f"{dtype} ({part})")
+                locations.append(part)
+            elif dtype:
+                damage_types.append(dtype)
+            elif part:
+                locations.append(part)
+    else:
+        # fallback: look for simple fields
+        dtype_field = raw.get("damage_type") or raw.get("damage")
+        if dtype_field:
+            if isinstance(dtype_field, list):
+                damage_types = dtype_field
+            else:
+                damage_types = [str(dtype_field)]
+
+        # maybe a direct location key
+        loc = raw.get("location") or raw.get("part")
+        if loc:
+            if isinstance(loc, list):
+                locations.extend(loc)
+            else:
+                locations.append(str(loc))
+
+    # build damage_type and location strings
+    damage_type_out = damage_types if damage_types else (raw.get("damage_type") or "Unknown")
+    if isinstance(damage_type_out, list) and len(damage_type_out) == 1:
+        damage_type_out = damage_type_out[0]  # single string is friendlier
+
+    location_out = ", ".join(locations) if locations else (raw.get("location") or "")
+
+    notes = raw.get("notes") or raw.get("note") or raw.get("raw_output") or ""
+    return damage_type_out, location_out, notes
+
+
+def cost_fields(raw: dict):
+    """The raw (usd, inr, jpy) cost values of a parsed model answer, before parsing."""
+    # costs: try various keys
+    est = raw.get("estimated_cost") or raw.get("estimatedCosts") or {}
+    if isinstance(est, dict):
+        usd_raw = est.get("usd") or est.get("USD") or est.get("dollars")
+        inr_raw = est.get("inr") or est.get("INR")
+        jpy_raw = est.get("jpy") or est.get("JPY") or est.get("yen")
+    else:
+        # maybe top-level cost fields
+        usd_raw = raw.get("cost_usd") or raw.get("costUSD") or raw.get("usd")
+        inr_raw = raw.get("cost_inr") or raw.get("costINR") or raw.get("inr")
+        jpy_raw = raw.get("cost_yen") or raw.get("costJPY") or raw.get("jpy")
+    return usd_raw, inr_raw, jpy_raw
+
+
+def base_cost(usd_raw, inr_raw=None, jpy_raw=None, rates=None) -> float:
+    """
+    Estimate in the base currency (USD). The model is only asked for USD;
+    INR / JPY are read as a fallback for answers from the older prompt.
+    """
+    rates = rates if rates is not None else fx_table.rates()
+    for code, value in (("USD", usd_raw), ("INR", inr_raw), ("JPY", jpy_raw)):
+        amount = _parse_number_from_string(value)
+        rate = rates.get(code)
+        if amount > 0 and rate:
+            return amount / rate
+    return 0.0
+
+
+def convert_costs(base: float, rates=None) -> dict:
+    """{currency code: amount} for every currency in the FX table, rounded to 2 places."""
+    rates = rates if rates is not None else fx_table.rates()
+    return {code: round(base * rate, 2) for code, rate in rates.items()}
+
+
+def damage_type_text(damage_type) -> str:
+    """damage_type as stored in the analysis table (lists joined with ", ")."""
+    if isinstance(damage_type, str):
+        return damage_type
+    if isinstance(damage_type, list):
+        return ", ".join(damage_type)
+    return "Unknown"
+
+
+def normalize_analysis(raw):
+    """
+    Accept parsed JSON from Gemini (various shapes) and return a stable dict:
+    {
+      damage_type: string or list,
+      location: string,
+      cost_inr: float,
+      cost_usd: float,
+      cost_yen: float,
+      costs: {currency code: float} for every currency in the FX table,
+      uploadedImage: (populated later),
+      notes: string
+    }
+    The model estimates in USD only; the other currencies come from backend.fx.
+    """
+    rates = fx_table.rates()
+    if not isinstance(raw, dict):
+        costs = convert_costs(0.0, rates)
+        return {
+            "damage_type": "Unknown",
+            "location": "",
+            "cost_inr": 0.0,
+            "cost_usd": 0.0,
+            "cost_yen": 0.0,
+            "costs": costs,
+            "notes": str(raw)
+        }
+
+    damage_type_out, location_out, notes = describe_damage(raw)
+    costs = convert_costs(base_cost(*cost_fields(raw), rates=rates), rates)
+
+    return {
+        "damage_type": damage_type_out,
+        "location": location_out,
+        "cost_inr": costs.get("INR", 0.0),
+        "cost_usd": costs.get("USD", 0.0),
+        "cost_yen": costs.get("JPY", 0.0),
+        "costs": costs,
+        "notes": notes
+    }
+
+
+def normalize_report(report):
+    """
+    normalize_analysis for an answer validated by schema.DamageReport: the same
+    dict, read straight from the typed fields instead of guessing keys.
+    """
+    rates = fx_table.rates()
+    damage_types = []
+    locations = []
+    for d in report.damages:
+        if d.damage_type and d.part:
+            damage_types.append(f"{d.damage_type} ({d.part})")
+        elif d.damage_type:
+            damage_types.append(d.damage_type)
+        if d.part:
+            locations.append(d.part)
+    damage_type_out = damage_types[0] if len(damage_types) == 1 else (damage_types or "Unknown")
+    costs = convert_costs(base_cost(report.estimated_cost.usd, rates=rates), rates)
+
+    return {
+        "damage_type": damage_type_out,
+        "location": ", ".join(locations),
+        "cost_inr": costs.get("INR", 0.0),
+        "cost_usd": costs.get("USD", 0.0),
+        "cost_yen": costs.get("JPY", 0.0),
+        "costs": costs,
+        "notes": report.notes
+    }
+
+
+def split_batch(raw, count):
+    """
+    Split a multi-image response from gemini_client.analyze_damage_batch into
+    `count` per-image answers, in upload order. Accepts
+    {"images": [{"image": 1, "damages": [...], "estimated_cost": {...}, "notes": ...}, ...]}
+    (or a bare list of those); entries are matched by their 1-based "image"
+    number, falling back to position. Images the model skipped come back as
+    {}; unparsed output is returned for every image.
+    """
+    if isinstance(raw, dict) and "raw_output" in raw and "images" not in raw:
+        return [raw] * count
+
+    items = raw.get("images") if isinstance(raw, dict) else raw
+    if not isinstance(items, list):
+        items = []
+
+    per_image = [None] * count
+    for pos, item in enumerate(items):
+        if not isinstance(item, dict):
+            continue
+        idx = item.get("image")
+        try:
+            idx = int(idx) - 1
+        except (TypeError, ValueError):
+            idx = pos
+        if 0 <= idx < count and per_image[idx] is None:
+            per_image[idx] = item
+
+    return [item if item is not None else {} for item in per_image]
@@ -0,0 +1,160 @@
+# backend/phash.py
+import threading
+from io import BytesIO
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+from sqlalchemy.orm import Session
+
+from backend.database import ImageFingerprint
+
+__all__ = ["average_hash", "difference_hash", "perceptual_hash", "hamming", "BKTree", "PerceptualIndex", "fingerprint_index"]
+
+_HASH_SIZE = 8       # 8x8 -> 64-bit hashes
+_PHASH_SAMPLE = 32   # pHash works on a 32x32 thumbnail
+
+
+def _to_image(image: Union[bytes, Image.Image]) -> Image.Image:
+    if isinstance(image, Image.Image):
+        return image
+    return Image.open(BytesIO(image))
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    value = 0
+    for bit in bits.ravel():
+        value = (value << 1) | int(bit)
+    return value
+
+
+def _grey(image: Union[bytes, Image.Image], size: Tuple[int, int]) -> np.ndarray:
+    img = _to_image(image).convert("L").resize(size, Image.LANCZOS)
+    return np.asarray(img, dtype=np.float64)
+
+
+def average_hash(image: Union[bytes, Image.Image]) -> int:
+    """aHash: pixels brighter than the mean of an 8x8 thumbnail."""
+    px = _grey(image, (_HASH_SIZE, _HASH_SIZE))
+    return _bits_to_int(px > px.mean())
+
+
+def difference_hash(image: Union[bytes, Image.Image]) -> int:
+    """dHash: horizontal brightness gradient of a 9x8 thumbnail."""
+    px = _grey(image, (_HASH_SIZE + 1, _HASH_SIZE))
+    return _bits_to_int(px[:, 1:] > px[:, :-1])
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    m = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    m[0, :] = np.sqrt(1.0 / n)
+    return m
+
+
+_DCT = _dct_matrix(_PHASH_SAMPLE)
+
+
+def perceptual_hash(image: Union[bytes, Image.Image]) -> int:
+    """
+    pHash: low-frequency DCT coefficients of a 32x32 greyscale thumbnail,
+    thresholded at their median. Robust to recompression and resizing.
+    """
+    px = _grey(image, (_PHASH_SAMPLE, _PHASH_SAMPLE))
+    coeffs = (_DCT @ px @ _DCT.T)[:_HASH_SIZE, :_HASH_SIZE]
+    # the DC term only reflects overall brightness; leave it out of the median
+    median = np.median(coeffs.ravel()[1:])
+    return _bits_to_int(coeffs > median)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over 64-bit hashes. Radius queries only descend into
+    children whose edge distance lies within [d - r, d + r], so a lookup touches
+    a small fraction of the stored hashes for small radii.
+    """
+
+    def __init__(self):
+        self._root = None  # [hash, value, {distance: child}]
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, h: int, value) -> None:
+        node = [h, value, {}]
+        if self._root is None:
+            self._root = node
+            self._size = 1
+            return
+        cur = self._root
+        while True:
+            d = hamming(h, cur[0])
+            child = cur[2].get(d)
+            if child is None:
+                cur[2][d] = node
+                self._size += 1
+                return
+            cur = child
+
+    def search(self, h: int, radius: int) -> List[Tuple[int, object]]:
+        """Return (distance, value) pairs within radius, closest first."""
+        if self._root is None:
+            return []
+        out = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            d = hamming(h, node[0])
+            if d <= radius:
+                out.append((d, node[1]))
+            lo, hi = d - radius, d + radius
+            for edge, child in node[2].items():
+                if lo <= edge <= hi:
+                    stack.append(child)
+        out.sort(key=lambda x: x[0])
+        return out
+
+
+class PerceptualIndex:
+    """
+    In-memory BK-tree of stored fingerprints, keyed to analysis ids.
+    Rows written by other processes are picked up incrementally by sync().
+    """
+
+    def __init__(self):
+        self._tree = BKTree()
+        self._last_id = 0
+        self._lock = threading.Lock()
+
+    def sync(self, db: Session) -> None:
+        rows = (
+            db.query(ImageFingerprint.analysis_id, ImageFingerprint.phash)
+            .filter(ImageFingerprint.analysis_id > self._last_id)
+            .order_by(ImageFingerprint.analysis_id)
+            .all()
+        )
+        with self._lock:
+            for analysis_id, hex_hash in rows:
+                if analysis_id > self._last_id:
+                    self._tree.add(int(hex_hash, 16), analysis_id)
+                    self._last_id = analysis_id
+
+    def nearest(self, h: int, max_distance: int) -> Optional[Tuple[int, int]]:
+        """Return (distance, analysis_id) of the closest stored image, if any is in range."""
+        with self._lock:
+            hits = self._tree.search(h, max_distance)
+        return hits[0] if hits else None
+
+    def remember(self, db: Session, analysis_id: int, h: int) -> None:
+        """Add a fingerprint row for analysis_id. Caller commits; the tree catches up on next sync()."""
+        db.add(ImageFingerprint(analysis_id=analysis_id, phash=f"{h:016x}"))
+
+
+# process-wide index shared by the API
+fingerprint_index = PerceptualIndex()
@@ -0,0 +1,93 @@
+# backend/preprocess.py
+import os
+from io import BytesIO
+from typing import NamedTuple, Optional, Union
+
+from PIL import Image, ImageOps
+
+from backend.config import IMAGE_MAX_EDGE, IMAGE_FORMAT, IMAGE_QUALITY
+
+__all__ = ["PreparedImage", "prepare_for_model", "sniff_mime_type"]
+
+_MIME_BY_FORMAT = {
+    "JPEG": "image/jpeg",
+    "PNG": "image/png",
+    "WEBP": "image/webp",
+    "GIF": "image/gif",
+    "BMP": "image/bmp",
+    "TIFF": "image/tiff",
+    "HEIF": "image/heif",
+}
+
+
+class PreparedImage(NamedTuple):
+    data: bytes                    # bytes to send to the model
+    mime_type: str
+    image: Optional[Image.Image]   # decoded, oriented, resized image (None if undecodable)
+    original_bytes: int
+
+
+def sniff_mime_type(data: bytes) -> str:
+    """Guess the image MIME type from magic bytes (defaults to image/png)."""
+    if data[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "image/png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if data[4:12] in (b"ftypheic", b"ftypheix", b"ftypmif1", b"ftypmsf1"):
+        return "image/heic"
+    return "image/png"
+
+
+def _read_bytes(source: Union[bytes, str]) -> bytes:
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    with open(source, "rb") as f:
+        return f.read()
+
+
+def prepare_for_model(
+    source: Union[bytes, str],
+    max_edge: int = IMAGE_MAX_EDGE,
+    fmt: str = IMAGE_FORMAT,
+    quality: int = IMAGE_QUALITY,
+) -> PreparedImage:
+    """
+    Decode the upload (raw bytes or a file path) once, apply EXIF orientation, shrink it so the longest edge
+    is at most max_edge and re-encode it as JPEG/WebP. If the image cannot be
+    decoded, or re-encoding would not make a small upright image any smaller,
+    the original bytes are passed through.
+    """
+    original_size = len(source) if isinstance(source, (bytes, bytearray)) else os.path.getsize(source)
+    try:
+        img = Image.open(BytesIO(source) if isinstance(source, (bytes, bytearray)) else source)
+        src_format = img.format
+        # exif_transpose always returns a copy, so decide from the tag and the full size
+        changed = img.getexif().get(0x0112, 1) != 1 or max(img.size) > max_edge
+        # let the JPEG decoder scale down by DCT factors before full decode
+        if src_format == "JPEG":
+            img.draft("RGB", (max_edge, max_edge))
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        if max(img.size) > max_edge:
+            img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+    except Exception:
+        data = _read_bytes(source)
+        return PreparedImage(data, sniff_mime_type(data), None, original_size)
+
+    fmt = fmt if fmt in ("JPEG", "WEBP") else "JPEG"
+    buf = BytesIO()
+    if fmt == "WEBP":
+        img.save(buf, format="WEBP", quality=quality, method=4)
+    else:
+        img.save(buf, format="JPEG", quality=quality, optimize=True)
+    encoded = buf.getvalue()
+
+    if not changed and len(encoded) >= original_size:
+        data = _read_bytes(source)
+        return PreparedImage(data, _MIME_BY_FORMAT.get(src_format, sniff_mime_type(data)), img, original_size)
+    return PreparedImage(encoded, _MIME_BY_FORMAT[fmt], img, original_size)
@@ -0,0 +1,172 @@
+# backend/ratelimit.py
+import collections
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+__all__ = [
+    "RateLimitTimeout",
+    "FairSemaphore",
+    "TokenBucket",
+    "SqliteTokenBucket",
+    "ModelCallLimiter",
+]
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a caller waited longer than allowed for a model-call slot."""
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class FairSemaphore:
+    """
+    Counting semaphore that admits waiters strictly in arrival order (unlike
+    threading.Semaphore), with a bounded wait.
+    """
+
+    def __init__(self, limit: int):
+        self._limit = limit
+        self._in_use = 0
+        self._waiters = collections.deque()
+        self._cond = threading.Condition()
+
+    def acquire(self, timeout: Optional[float] = None) -> None:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            ticket = object()
+            self._waiters.append(ticket)
+            try:
+                while self._waiters[0] is not ticket or self._in_use >= self._limit:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise RateLimitTimeout("timed out waiting for a model-call slot")
+                    self._cond.wait(remaining)
+                self._in_use += 1
+            finally:
+                self._waiters.remove(ticket)
+                self._cond.notify_all()
+
+    def release(self) -> None:
+        with self._cond:
+            self._in_use -= 1
+            self._cond.notify_all()
+
+    @property
+    def in_use(self) -> int:
+        return self._in_use
+
+
+class TokenBucket:
+    """In-process token bucket: `rate_per_minute` refill with `burst` capacity."""
+
+    def __init__(self, rate_per_minute: float, burst: int):
+        self._rate = rate_per_minute / 60.0
+        self._capacity = float(max(1, burst))
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_take(self) -> float:
+        """Take a token if one is available; otherwise return seconds until the next one."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+            self._updated = now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return 0.0
+            return (1.0 - self._tokens) / self._rate
+
+
+class SqliteTokenBucket:
+    """
+    Token bucket kept in a small SQLite file so every worker process on the host
+    draws from the same requests-per-minute budget. Each take is one
+    BEGIN IMMEDIATE transaction on a single row.
+    """
+
+    def __init__(self, path: str, rate_per_minute: float, burst: int, name: str = "gemini"):
+        self._path = path
+        self._name = name
+        self._rate = rate_per_minute / 60.0
+        self._capacity = float(max(1, burst))
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS token_bucket (name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)")
+        conn.execute(
+            "INSERT OR IGNORE INTO token_bucket (name, tokens, updated) VALUES (?, ?, ?)",
+            (name, self._capacity, time.time()),
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def try_take(self) -> float:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            tokens, updated = conn.execute(
+                "SELECT tokens, updated FROM token_bucket WHERE name = ?", (self._name,)
+            ).fetchone()
+            now = time.time()
+            tokens = min(self._capacity, tokens + max(0.0, now - updated) * self._rate)
+            wait = 0.0
+            if tokens >= 1.0:
+                tokens -= 1.0
+            else:
+                wait = (1.0 - tokens) / self._rate
+            conn.execute("UPDATE token_bucket SET tokens = ?, updated = ? WHERE name = ?", (tokens, now, self._name))
+            conn.execute("COMMIT")
+            return wait
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+
+class ModelCallLimiter:
+    """
+    Gate in front of every model call: callers queue in FIFO order for the
+    requests-per-minute bucket (if configured), then for one of `max_in_flight`
+    slots. Waiting longer than `max_wait` seconds in total raises RateLimitTimeout.
+    """
+
+    def __init__(self, max_in_flight: int, bucket=None, max_wait: float = 30.0):
+        self._slots = FairSemaphore(max_in_flight)
+        self._bucket = bucket
+        self._bucket_turn = FairSemaphore(1)  # one waiter at a time polls the bucket, in arrival order
+        self._max_wait = max_wait
+
+    def _take_token(self, deadline: float) -> None:
+        self._bucket_turn.acquire(max(0.0, deadline - time.monotonic()))
+        try:
+            while True:
+                wait = self._bucket.try_take()
+                if wait <= 0:
+                    return
+                remaining = deadline - time.monotonic()
+                if wait > remaining:
+                    raise RateLimitTimeout("model requests-per-minute budget exhausted", wait)
+                time.sleep(wait)
+        finally:
+            self._bucket_turn.release()
+
+    @contextmanager
+    def slot(self, max_wait: Optional[float] = None):
+        deadline = time.monotonic() + (self._max_wait if max_wait is None else max_wait)
+        if self._bucket is not None:
+            self._take_token(deadline)
+        self._slots.acquire(max(0.0, deadline - time.monotonic()))
+        try:
+            yield
+        finally:
+            self._slots.release()
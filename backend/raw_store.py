@@ -0,0 +1,86 @@
+# backend/raw_store.py
+import json
+import zlib
+from typing import Iterator, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from backend.database import SessionLocal, AnalysisRaw
+
+__all__ = ["CODEC", "encode_raw", "decode_raw", "remember_raw", "iter_raw"]
+
+# Preset zlib dictionary built from the answer schema and the parts / damage
+# types the model names most. Answers are a few hundred bytes, too short for
+# zlib to find repeats on its own; with the dictionary they shrink to about
+# 40% of their JSON size. zlib favours matches near the end, so the most
+# common strings go last. Never edit a dictionary in place: add a new codec
+# and keep the old one so existing rows still decode.
+_ZDICT_V1 = (
+    "hidden structural damage alignment frame chassis airbag sensor wiring paint matching "
+    "repaint replace repair crack cracked shattered misaligned detached missing "
+    "windshield windscreen side mirror wing mirror tail light taillight headlight fog light "
+    "grille radiator hood bonnet trunk boot roof fender rear bumper front bumper "
+    "front left door front right door rear left door rear right door quarter panel wheel rim tyre "
+    "scratch dent broken "
+    '{"raw_output":"'
+    '{"images":[{"image":1,'
+    '"notes":"Check for '
+    '"estimated_cost":{"usd":"","inr":"","jpy":""},'
+    '{"damages":[{"part":"front bumper","damage_type":"dent"},{"part":"","damage_type":"scratch"}],'
+).encode("utf-8")
+
+_DICTIONARIES = {"zlib-d1": _ZDICT_V1}
+CODEC = "zlib-d1"
+
+
+def encode_raw(raw, codec: str = CODEC) -> bytes:
+    """Compact JSON of a parsed model answer, compressed against the codec's dictionary."""
+    data = json.dumps(raw, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    compressor = zlib.compressobj(level=9, zdict=_DICTIONARIES[codec])
+    return compressor.compress(data) + compressor.flush()
+
+
+def decode_raw(codec: str, payload: bytes):
+    """Inverse of encode_raw; raises ValueError for an unknown codec."""
+    zdict = _DICTIONARIES.get(codec)
+    if zdict is None:
+        raise ValueError(f"unknown raw payload codec {codec!r}")
+    decompressor = zlib.decompressobj(zdict=zdict)
+    return json.loads(decompressor.decompress(payload) + decompressor.flush())
+
+
+def remember_raw(db: Session, analysis_id: int, raw, prompt_version: str, model_name: str) -> None:
+    """Store the model answer behind an analysis row. Caller commits."""
+    db.add(AnalysisRaw(
+        analysis_id=analysis_id,
+        codec=CODEC,
+        payload=encode_raw(raw),
+        prompt_version=prompt_version,
+        model_name=model_name,
+    ))
+
+
+def iter_raw(
+    session_factory=SessionLocal,
+    batch_size: int = 10000,
+    prompt_version: Optional[str] = None,
+) -> Iterator[Tuple[int, object]]:
+    """Yield (analysis_id, raw answer) for every stored answer in id order, reading batch_size rows at a time."""
+    last_id = 0
+    while True:
+        stmt = (
+            select(AnalysisRaw.analysis_id, AnalysisRaw.codec, AnalysisRaw.payload)
+            .where(AnalysisRaw.analysis_id > last_id)
+            .order_by(AnalysisRaw.analysis_id)
+            .limit(batch_size)
+        )
+        if prompt_version is not None:
+            stmt = stmt.where(AnalysisRaw.prompt_version == prompt_version)
+        with session_factory() as db:
+            rows = db.execute(stmt).all()
+        if not rows:
+            return
+        for analysis_id, codec, payload in rows:
+            yield analysis_id, decode_raw(codec, payload)
+        last_id = rows[-1][0]
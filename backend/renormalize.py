@@ -0,0 +1,195 @@
+# backend/renormalize.py
+"""
+Re-run normalization over stored analyses after the normalization rules change:
+
+    python -m backend.renormalize [--prompt-version V] [--input raw.jsonl] [--batch-size 10000] [--dry-run]
+
+Reads the model answers stored in analysis_raw (optionally only those from
+one prompt version), or with --input a JSONL of {"analysis_id": 123, "raw": ...}
+lines, where raw is the parsed answer or its unparsed text, for analyses from
+before answers were stored. Rows are processed in batches: cost fields are
+pulled out column by column, each distinct cost string is parsed once, the
+USD column is converted with the current FX table, and the results are
+written back with one executemany UPDATE per batch. Content-hash cache
+entries of updated rows are dropped so re-uploads are not answered with the
+old numbers.
+"""
+import argparse
+import json
+import logging
+import time
+from typing import Iterable, Iterator, List, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import bindparam, delete, update
+
+from backend.cost_parser import parse_cost
+from backend.database import Analysis, ImageDigest, engine, init_db
+from backend.fx import fx_table
+from backend.normalize import cost_fields, damage_type_text, describe_damage, parse_model_text
+from backend.raw_store import iter_raw
+
+__all__ = ["NormalizedColumns", "normalize_columns", "write_columns", "renormalize"]
+
+logger = logging.getLogger(__name__)
+
+_CURRENCIES = ("usd", "inr", "jpy")
+
+
+class NormalizedColumns:
+    """A batch of normalized analyses as columns; costs are float64 arrays."""
+
+    def __init__(self, ids: np.ndarray, damage_type: List[str], location: List[str],
+                 cost_usd: np.ndarray, cost_inr: np.ndarray, cost_yen: np.ndarray):
+        self.ids = ids
+        self.damage_type = damage_type
+        self.location = location
+        self.cost_usd = cost_usd
+        self.cost_inr = cost_inr
+        self.cost_yen = cost_yen
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+def _cost_column(values: Sequence) -> np.ndarray:
+    """
+    Midpoints of one cost column. Dictionary-encodes the values so each distinct
+    string is parsed once, then gathers the parsed midpoints by code.
+    """
+    codes = np.empty(len(values), dtype=np.intp)
+    distinct = {}
+    for i, v in enumerate(values):
+        key = "" if v is None else (v if isinstance(v, str) else str(v))
+        code = distinct.get(key)
+        if code is None:
+            code = distinct[key] = len(distinct)
+        codes[i] = code
+    mids = np.fromiter((parse_cost(key).mid for key in distinct), dtype=np.float64, count=len(distinct))
+    return mids[codes]
+
+
+def normalize_columns(records: Sequence[Tuple[int, object]]) -> NormalizedColumns:
+    """Normalize (analysis_id, raw) pairs; raw is a parsed answer (dict) or model text."""
+    n = len(records)
+    ids = np.empty(n, dtype=np.int64)
+    damage_type: List[str] = []
+    location: List[str] = []
+    costs = {c: [None] * n for c in _CURRENCIES}
+    for i, (analysis_id, raw) in enumerate(records):
+        ids[i] = analysis_id
+        if isinstance(raw, str):
+            raw = parse_model_text(raw)
+        if not isinstance(raw, dict):
+            damage_type.append("Unknown")
+            location.append("")
+            continue
+        dtype, loc, _ = describe_damage(raw)
+        damage_type.append(damage_type_text(dtype))
+        location.append(loc or "")
+        costs["usd"][i], costs["inr"][i], costs["jpy"][i] = cost_fields(raw)
+    # base-currency (USD) estimate; INR / JPY only fill in for answers from the older prompt
+    rates = fx_table.rates()
+    base = _cost_column(costs["usd"])
+    for currency, code in (("inr", "INR"), ("jpy", "JPY")):
+        rate = rates.get(code)
+        if rate and not base.all():
+            base = np.where(base > 0, base, _cost_column(costs[currency]) / rate)
+    return NormalizedColumns(
+        ids,
+        damage_type,
+        location,
+        cost_usd=np.round(base * rates.get("USD", 0.0), 2),
+        cost_inr=np.round(base * rates.get("INR", 0.0), 2),
+        cost_yen=np.round(base * rates.get("JPY", 0.0), 2),
+    )
+
+
+_UPDATE = (
+    update(Analysis.__table__)
+    .where(Analysis.__table__.c.id == bindparam("_id"))
+    .values(
+        damage_type=bindparam("_damage_type"),
+        location=bindparam("_location"),
+        cost_usd=bindparam("_cost_usd"),
+        cost_inr=bindparam("_cost_inr"),
+        cost_yen=bindparam("_cost_yen"),
+    )
+)
+
+
+def write_columns(conn, cols: NormalizedColumns) -> None:
+    """One executemany UPDATE for the batch, then drop its stale content-hash cache entries."""
+    ids = cols.ids.tolist()
+    params = [
+        {"_id": i, "_damage_type": d, "_location": loc, "_cost_usd": u, "_cost_inr": r, "_cost_yen": y}
+        for i, d, loc, u, r, y in zip(
+            ids,
+            cols.damage_type,
+            cols.location,
+            cols.cost_usd.tolist(),
+            cols.cost_inr.tolist(),
+            cols.cost_yen.tolist(),
+        )
+    ]
+    conn.execute(_UPDATE, params)
+    conn.execute(delete(ImageDigest).where(ImageDigest.analysis_id.in_(ids)))
+
+
+def _batches(records: Iterable[Tuple[int, object]], size: int) -> Iterator[List[Tuple[int, object]]]:
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _read_jsonl(path: str) -> Iterator[Tuple[int, object]]:
+    with open(path, encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+                yield int(item["analysis_id"]), item.get("raw")
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning("skipping line %d: %s", lineno, e)
+
+
+def renormalize(records: Iterable[Tuple[int, object]], batch_size: int = 10000, dry_run: bool = False) -> int:
+    """Normalize and write back (analysis_id, raw) pairs; returns the number of rows processed."""
+    total = 0
+    started = time.perf_counter()
+    for batch in _batches(records, batch_size):
+        cols = normalize_columns(batch)
+        if not dry_run:
+            with engine.begin() as conn:
+                write_columns(conn, cols)
+        total += len(cols)
+        logger.info("%d rows (%.0f rows/s)", total, total / (time.perf_counter() - started))
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-run normalization over stored analyses.")
+    parser.add_argument("--input", help="JSONL of {analysis_id, raw} instead of the analysis_raw table")
+    parser.add_argument("--prompt-version", help="only answers stored under this prompt version")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--dry-run", action="store_true", help="normalize only, do not write")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    init_db()
+    batch_size = max(1, args.batch_size)
+    if args.input:
+        records = _read_jsonl(args.input)
+    else:
+        records = iter_raw(batch_size=batch_size, prompt_version=args.prompt_version)
+    total = renormalize(records, batch_size=batch_size, dry_run=args.dry_run)
+    logging.getLogger(__name__).info("renormalized %d analyses%s", total, " (dry run)" if args.dry_run else "")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# backend/retry.py
+import logging
+import random
+import threading
+import time
+from typing import Callable, Optional, TypeVar
+
+__all__ = ["DeadlineExceeded", "CallCancelled", "RetryPolicy", "HedgeBudget", "call_with_retry"]
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(TimeoutError):
+    """The overall time budget for a call ran out."""
+
+
+class CallCancelled(Exception):
+    """The caller no longer needs the result (e.g. the other leg of a hedge won)."""
+
+
+class RetryPolicy:
+    """
+    Up to `max_attempts` tries inside a `deadline` (seconds) budget; each try
+    gets at most `attempt_timeout` seconds. Sleeps between tries use full
+    jitter: uniform(0, min(max_backoff, base_backoff * 2 ** (attempt - 1))).
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        attempt_timeout: float = 30.0,
+        deadline: float = 60.0,
+        base_backoff: float = 0.5,
+        max_backoff: float = 8.0,
+    ):
+        self.max_attempts = max(1, max_attempts)
+        self.attempt_timeout = attempt_timeout
+        self.deadline = deadline
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0.0, min(self.max_backoff, self.base_backoff * (2 ** (attempt - 1))))
+
+
+def call_with_retry(
+    fn: Callable[[float], T],
+    policy: RetryPolicy,
+    is_retryable: Callable[[BaseException], bool],
+    on_attempt: Optional[Callable[[int, float, Optional[BaseException]], None]] = None,
+    deadline: Optional[float] = None,
+) -> T:
+    """
+    Call fn(timeout) until it succeeds, fails with a non-retryable error, runs
+    out of attempts, or the deadline (time.monotonic() value, default now +
+    policy.deadline) would pass before the next try. on_attempt(attempt,
+    seconds, error) is called after every try.
+    """
+    if deadline is None:
+        deadline = time.monotonic() + policy.deadline
+    attempt = 0
+    while True:
+        attempt += 1
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"deadline exceeded after {attempt - 1} attempt(s)")
+        start = time.monotonic()
+        try:
+            result = fn(min(policy.attempt_timeout, remaining))
+        except Exception as e:
+            elapsed = time.monotonic() - start
+            if on_attempt is not None:
+                on_attempt(attempt, elapsed, e)
+            if attempt >= policy.max_attempts or not is_retryable(e):
+                raise
+            delay = policy.backoff(attempt)
+            if time.monotonic() + delay >= deadline:
+                raise
+            logger.warning("attempt %d failed after %.2fs (%s); retrying in %.2fs", attempt, elapsed, e, delay)
+            time.sleep(delay)
+            continue
+        if on_attempt is not None:
+            on_attempt(attempt, time.monotonic() - start, None)
+        return result
+
+
+class HedgeBudget:
+    """
+    Caps hedged (duplicate) calls at `ratio` of primary calls. Every primary call
+    earns `ratio` credit (banked up to `burst`); a hedge spends one credit.
+    """
+
+    def __init__(self, ratio: float = 0.05, burst: float = 10.0):
+        self._ratio = ratio
+        self._burst = burst
+        self._credit = 0.0
+        self._lock = threading.Lock()
+
+    def on_call(self) -> None:
+        with self._lock:
+            self._credit = min(self._burst, self._credit + self._ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._credit >= 1.0:
+                self._credit -= 1.0
+                return True
+            return False
@@ -0,0 +1,159 @@
+# backend/schema.py
+import collections
+from typing import List, NamedTuple, Optional, Union
+
+from pydantic import BaseModel, ConfigDict, ValidationError
+
+from backend.normalize import parse_model_text, split_batch
+
+__all__ = [
+    "Damage",
+    "EstimatedCost",
+    "DamageReport",
+    "ImageDamageReport",
+    "BatchDamageReport",
+    "DAMAGE_RESPONSE_SCHEMA",
+    "BATCH_RESPONSE_SCHEMA",
+    "ModelAnswer",
+    "parse_report",
+    "split_report",
+    "parse_stats",
+]
+
+
+# Every field is required and unknown keys are rejected: an answer that does
+# not follow the schema takes the lenient fallback and is counted there,
+# rather than validating as an empty report.
+_STRICT = ConfigDict(extra="forbid")
+
+
+class Damage(BaseModel):
+    model_config = _STRICT
+
+    part: str
+    damage_type: str
+
+
+class EstimatedCost(BaseModel):
+    model_config = _STRICT
+
+    usd: Union[str, float]
+
+
+class DamageReport(BaseModel):
+    """One image's answer to DAMAGE_PROMPT."""
+
+    model_config = _STRICT
+
+    damages: List[Damage]
+    estimated_cost: EstimatedCost
+    notes: str
+
+
+class ImageDamageReport(DamageReport):
+    image: int
+
+
+class BatchDamageReport(BaseModel):
+    """Answer to BATCH_DAMAGE_PROMPT: one report per image."""
+
+    model_config = _STRICT
+
+    images: List[ImageDamageReport]
+
+
+# Response schemas for constrained generation (the OpenAPI subset Gemini accepts:
+# no $ref or defaults, so they are written out rather than taken from the models)
+_DAMAGE_PROPERTIES = {
+    "damages": {
+        "type": "array",
+        "items": {
+            "type": "object",
+            "properties": {
+                "part": {"type": "string"},
+                "damage_type": {"type": "string"},
+            },
+            "required": ["part", "damage_type"],
+        },
+    },
+    "estimated_cost": {
+        "type": "object",
+        "properties": {"usd": {"type": "string"}},
+        "required": ["usd"],
+    },
+    "notes": {"type": "string"},
+}
+
+DAMAGE_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": _DAMAGE_PROPERTIES,
+    "required": ["damages", "estimated_cost", "notes"],
+}
+
+BATCH_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "images": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"image": {"type": "integer"}, **_DAMAGE_PROPERTIES},
+                "required": ["image", "damages", "estimated_cost", "notes"],
+            },
+        },
+    },
+    "required": ["images"],
+}
+
+# How model answers were parsed: "validated" in one pass, "fallback" to the
+# lenient parser, and of those "unparsed" when no JSON could be recovered at all
+parse_stats = collections.Counter()
+
+
+class ModelAnswer(NamedTuple):
+    """
+    A parsed model answer. `raw` is the decoded answer, as stored in
+    analysis_raw; `report` is the typed report when the answer validated
+    against the schema, else None and `raw` came from the lenient parser.
+    """
+
+    raw: dict
+    report: Optional[Union[DamageReport, BatchDamageReport]]
+
+
+def parse_report(text: str, batch: bool = False) -> ModelAnswer:
+    """
+    Validate the model's JSON answer against DamageReport (BatchDamageReport
+    with batch=True) in a single pass into typed objects. The models require
+    every field and forbid extra keys, so the report's dump is the decoded
+    answer in full. Answers that do not validate go through
+    normalize.parse_model_text instead, which may return
+    {'raw_output': text}; parse_stats counts both paths.
+    """
+    model = BatchDamageReport if batch else DamageReport
+    try:
+        report = model.model_validate_json(text)
+    except ValidationError:
+        parse_stats["fallback"] += 1
+        raw = parse_model_text(text)
+        if isinstance(raw, dict) and "raw_output" in raw:
+            parse_stats["unparsed"] += 1
+        return ModelAnswer(raw, None)
+    parse_stats["validated"] += 1
+    return ModelAnswer(report.model_dump(mode="json"), report)
+
+
+def split_report(answer: ModelAnswer, count: int) -> List[ModelAnswer]:
+    """
+    Per-image answers of a batch answer, in upload order (see
+    normalize.split_batch). Images the model skipped come back as
+    ModelAnswer({}, None).
+    """
+    if answer.report is None:
+        return [ModelAnswer(raw, None) for raw in split_batch(answer.raw, count)]
+    per_image: List[Optional[ModelAnswer]] = [None] * count
+    for item in answer.report.images:
+        idx = item.image - 1
+        if 0 <= idx < count and per_image[idx] is None:
+            per_image[idx] = ModelAnswer(item.model_dump(mode="json"), item)
+    return [a if a is not None else ModelAnswer({}, None) for a in per_image]
@@ -0,0 +1,181 @@
+# backend/uploads.py
+import hashlib
+import os
+import shutil
+import uuid
+from typing import Callable, NamedTuple, Optional
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+
+from backend.config import UPLOAD_MAX_BYTES, UPLOAD_CHUNK_BYTES
+from backend.preprocess import sniff_mime_type
+
+__all__ = [
+    "MULTIPART_OVERHEAD_BYTES",
+    "UploadTooLarge",
+    "BodySizeLimit",
+    "IngestedUpload",
+    "ingest_upload",
+    "finalize_upload",
+    "discard_upload",
+]
+
+# allowance per file for multipart boundaries, part headers and other form fields
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+_EXT_BY_MIME = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+    "image/gif": ".gif",
+    "image/heic": ".heic",
+}
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class _BodyTooLarge(HTTPException):
+    # an HTTPException, so FastAPI re-raises it from form parsing instead of turning it into a 400
+    def __init__(self, limit: int):
+        super().__init__(status_code=413, detail=f"request body exceeds limit of {limit} bytes")
+
+
+class BodySizeLimit:
+    """
+    ASGI middleware that caps request bodies before the app parses them.
+    limit_for(path) gives the byte limit for a path (None: unlimited). A larger
+    Content-Length is answered with 413 straight away; otherwise the body is
+    counted as it streams in and the request fails with 413 as soon as the
+    limit is crossed, so an oversized upload is never spooled in full.
+    """
+
+    def __init__(self, app, limit_for: Callable[[str], Optional[int]]):
+        self.app = app
+        self._limit_for = limit_for
+
+    async def __call__(self, scope, receive, send):
+        limit = self._limit_for(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope.get("headers", ()):
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    break
+                if declared > limit:
+                    await self._reject(scope, receive, send, limit)
+                    return
+                break
+
+        received = 0
+        started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise _BodyTooLarge(limit)
+            return message
+
+        async def tracking_send(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except _BodyTooLarge:
+            if started:
+                raise
+            await self._reject(scope, receive, send, limit)
+
+    @staticmethod
+    async def _reject(scope, receive, send, limit: int) -> None:
+        response = JSONResponse(status_code=413, content={"detail": f"request body exceeds limit of {limit} bytes"})
+        await response(scope, receive, send)
+
+
+class IngestedUpload(NamedTuple):
+    temp_path: str   # partial file in the (unserved) temp dir, see finalize_upload/discard_upload
+    digest: str      # hex SHA-256 of the content
+    mime_type: str   # sniffed from the first bytes
+    size: int
+    ext: str
+
+
+def _open_temp(dest_dir: str) -> tuple:
+    path = os.path.join(dest_dir, f".{uuid.uuid4().hex}.part")
+    return path, open(path, "wb")
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+async def ingest_upload(
+    file: UploadFile,
+    temp_dir: str,
+    max_bytes: int = UPLOAD_MAX_BYTES,
+    chunk_size: int = UPLOAD_CHUNK_BYTES,
+) -> IngestedUpload:
+    """
+    Stream an upload to a temporary file in temp_dir chunk by chunk, hashing
+    and sniffing its type in the same pass. Only one chunk is held in memory at
+    a time; UploadTooLarge is raised once this file exceeds max_bytes. The
+    request body as a whole is capped earlier by BodySizeLimit, before form
+    parsing. temp_dir must not be publicly served.
+    """
+    declared = getattr(file, "size", None)
+    if declared is not None and declared > max_bytes:
+        raise UploadTooLarge(f"upload is {declared} bytes, limit is {max_bytes}")
+
+    path, fh = await run_in_threadpool(_open_temp, temp_dir)
+    hasher = hashlib.sha256()
+    size = 0
+    mime_type = None
+    try:
+        while True:
+            chunk = await file.read(chunk_size)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge(f"upload exceeds limit of {max_bytes} bytes")
+            if mime_type is None:
+                mime_type = sniff_mime_type(chunk[:16])
+            hasher.update(chunk)
+            await run_in_threadpool(fh.write, chunk)
+    except BaseException:
+        await run_in_threadpool(fh.close)
+        await run_in_threadpool(_remove_quietly, path)
+        raise
+    await run_in_threadpool(fh.close)
+
+    mime_type = mime_type or "image/png"
+    ext = os.path.splitext(file.filename or "")[1].lower() or _EXT_BY_MIME.get(mime_type, ".png")
+    return IngestedUpload(path, hasher.hexdigest(), mime_type, size, ext)
+
+
+async def finalize_upload(upload: IngestedUpload, dest_dir: str) -> str:
+    """Move the temporary file to a unique public name and return that name."""
+    unique_name = f"{uuid.uuid4().hex}{upload.ext}"
+    # a rename when temp and upload dirs share a filesystem, a copy otherwise
+    await run_in_threadpool(shutil.move, upload.temp_path, os.path.join(dest_dir, unique_name))
+    return unique_name
+
+
+async def discard_upload(upload: IngestedUpload) -> None:
+    await run_in_threadpool(_remove_quietly, upload.temp_path)
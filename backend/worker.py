@@ -0,0 +1,53 @@
+# backend/worker.py
+"""
+Standalone worker for mode=async analyses:
+
+    python -m backend.worker [--workers N]
+
+Claims jobs from the analysis_job table shared with the API, so any number of
+these processes can run next to (or instead of) the API's in-process workers
+(JOB_WORKERS=0). Stop with Ctrl+C / SIGTERM; unfinished jobs are retried by
+another worker once their lease expires.
+"""
+import argparse
+import asyncio
+import logging
+import signal
+
+from backend.config import JOB_WORKERS
+from backend.database import init_db
+from backend.jobs import job_queue
+from backend.main import model_backend, process_job
+from backend.writer import analysis_writer
+
+
+async def _run(workers: int) -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+
+    job_queue.start(process_job, workers=workers)
+    logging.getLogger(__name__).info("analysis worker started with %d tasks", workers)
+    try:
+        await stop.wait()
+    finally:
+        await job_queue.stop()
+        analysis_writer.stop()
+        model_backend.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run async-analysis job workers.")
+    parser.add_argument("--workers", type=int, default=max(1, JOB_WORKERS))
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    init_db()
+    asyncio.run(_run(max(1, args.workers)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# backend/writer.py
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from backend.config import WRITE_BATCH_SIZE, WRITE_FLUSH_INTERVAL_MS
+from backend.database import SessionLocal, Analysis
+
+__all__ = ["AnalysisWriter", "analysis_writer"]
+
+logger = logging.getLogger(__name__)
+
+OnInsert = Callable[[Session, Analysis], None]
+_STOP = object()
+
+
+class AnalysisWriter:
+    """
+    Write-behind queue for Analysis inserts. A background thread collects
+    submitted rows and commits them together once batch_size rows are waiting
+    or flush_interval seconds have passed since the first one, so concurrent
+    requests share one fsync. submit() returns a Future resolving to the new
+    row id after its batch commits.
+    """
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        batch_size: int = WRITE_BATCH_SIZE,
+        flush_interval: float = WRITE_FLUSH_INTERVAL_MS / 1000.0,
+    ):
+        self._session_factory = session_factory
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="analysis-writer", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Flush everything queued so far and stop the background thread."""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def submit(self, entry: Analysis, on_insert: Optional[OnInsert] = None) -> Future:
+        """
+        Queue entry for insertion. on_insert(session, entry) runs after the row
+        is flushed (so entry.id is set) and before the commit, for dependent rows.
+        """
+        self.start()
+        future: Future = Future()
+        self._queue.put((entry, on_insert, future))
+        return future
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self._flush_interval
+            while len(batch) < self._batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+        # drain anything submitted before stop()
+        leftovers = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftovers.append(item)
+        for i in range(0, len(leftovers), self._batch_size):
+            self._commit(leftovers[i:i + self._batch_size])
+
+    def _commit(self, batch: List[Tuple[Analysis, Optional[OnInsert], Future]]) -> None:
+        try:
+            ids = self._insert(batch)
+        except Exception:
+            logger.exception("batched insert of %d analyses failed; retrying one by one", len(batch))
+            for item in batch:
+                try:
+                    ids = self._insert([item])
+                except Exception as e:
+                    item[2].set_exception(e)
+                else:
+                    item[2].set_result(ids[0])
+            return
+        for (_, _, future), row_id in zip(batch, ids):
+            future.set_result(row_id)
+
+    def _insert(self, batch) -> List[int]:
+        db = self._session_factory()
+        try:
+            db.add_all(entry for entry, _, _ in batch)
+            db.flush()
+            for entry, on_insert, _ in batch:
+                if on_insert is not None:
+                    on_insert(db, entry)
+            ids = [entry.id for entry, _, _ in batch]
+            db.commit()
+            return ids
+        except Exception:
+            db.rollback()
+            # detach so the rows can be retried in a new session
+            for entry, _, _ in batch:
+                if entry in db:
+                    db.expunge(entry)
+            raise
+        finally:
+            db.close()
+
+
+# process-wide writer used by the API
+analysis_writer = AnalysisWriter()
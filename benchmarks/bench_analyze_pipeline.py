@@ -0,0 +1,109 @@
+# benchmarks/bench_analyze_pipeline.py
+"""
+End-to-end /analyze/ throughput and latency against the offline fake model
+(MODEL_BACKEND=fake), so no API key or network is needed. The fake replaces
+only GenerativeModel.generate_content: calls still go through gemini_client's
+worker pool (GEMINI_MAX_WORKERS bounds how many are in flight), rate limiter,
+retries, circuit breaker and hedging.
+
+    python -m benchmarks.bench_analyze_pipeline [--requests 500] [--concurrency 8 32 128] [--latency-ms 2000]
+
+Runs in a temp directory with its own SQLite database and uploads folder.
+Requests go through httpx's in-process ASGI transport, so the numbers cover
+upload streaming, preprocessing, dedup lookups, the model call and the
+batched history write, but not the network. Every image is distinct, so
+nothing is answered from the dedup index.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from io import BytesIO
+
+
+def _configure_env(args):
+    workdir = tempfile.mkdtemp(prefix="car-ai-pipeline-")
+    os.chdir(workdir)
+    os.environ["MODEL_BACKEND"] = "fake"
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["FAKE_LATENCY_MEDIAN_MS"] = str(args.latency_ms)
+    os.environ["FAKE_LATENCY_SIGMA_PCT"] = str(args.sigma_pct)
+    os.environ["FAKE_MALFORMED_PCT"] = str(args.malformed_pct)
+    os.environ["FAKE_ERROR_PCT"] = str(args.error_pct)
+    os.environ.setdefault("JOB_WORKERS", "0")
+
+
+def _image(i, size=(1280, 960)):
+    from PIL import Image
+
+    img = Image.new("RGB", size, ((i * 37) % 256, (i * 91) % 256, (i * 53) % 256))
+    img.putpixel((i % size[0], (i // size[0]) % size[1]), (255, 255, 255))
+    buf = BytesIO()
+    img.save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+async def _run(app, images, concurrency):
+    import httpx
+
+    sem = asyncio.Semaphore(concurrency)
+    latencies, statuses = [], {}
+
+    async def one(client, data, n):
+        async with sem:
+            start = time.perf_counter()
+            resp = await client.post("/analyze/", files={"file": (f"car-{n}.jpg", data, "image/jpeg")})
+            latencies.append(time.perf_counter() - start)
+            key = resp.status_code
+            if resp.status_code == 200 and "error" in resp.json().get("analysis", {}):
+                key = "200 (error)"
+            statuses[key] = statuses.get(key, 0) + 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(one(client, data, n) for n, data in enumerate(images)))
+        wall = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "req/s": len(images) / wall,
+        "p50 ms": statistics.median(latencies) * 1000,
+        "p99 ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        "statuses": statuses,
+    }
+
+
+async def _main(args):
+    from backend.main import app
+
+    await app.router.startup()
+    try:
+        print(f"{'conc':>6}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}  statuses")
+        offset = 0
+        for conc in args.concurrency:
+            images = [_image(offset + i) for i in range(args.requests)]
+            offset += args.requests
+            r = await _run(app, images, conc)
+            print(f"{conc:>6}{r['req/s']:>10.1f}{r['p50 ms']:>10.0f}{r['p99 ms']:>10.0f}  {r['statuses']}")
+    finally:
+        await app.router.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8, 32, 128])
+    parser.add_argument("--latency-ms", type=int, default=2000)
+    parser.add_argument("--sigma-pct", type=int, default=50)
+    parser.add_argument("--malformed-pct", type=int, default=5)
+    parser.add_argument("--error-pct", type=int, default=0)
+    args = parser.parse_args()
+
+    _configure_env(args)
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# benchmarks/bench_cost_parser.py
+"""
+Per-call cost of backend.cost_parser against the regex-per-call parser it
+replaced, over a corpus of estimated_cost strings from model output.
+
+The headline is "first-seen": the uncached parser (_scan), which is what a new
+answer pays and what renormalization pays for every distinct string. It is
+also reported for the subset already in the format the prompt asks for
+("75" / "50-100"). "cached" is parse_cost replaying the same strings, i.e.
+lru_cache hits; it is shown for reference only, since the corpus repeats far
+more than real traffic does.
+
+    python -m benchmarks.bench_cost_parser [--corpus costs.txt] [--repeat 200]
+
+--corpus takes one cost string per line; by default the built-in CORPUS is
+used. Also prints the strings where the two parsers disagree on the midpoint.
+"""
+import argparse
+import re
+import time
+
+from backend.cost_parser import _scan, parse_cost
+
+# estimated_cost values as Gemini actually returned them (usd / inr / jpy fields)
+CORPUS = [
+    "150-250", "12000-20000", "22000-37000",
+    "$400 - $650", "₹33,000 - ₹54,000", "¥60,000-¥97,000",
+    "300", "25000", "45000",
+    "$1,200", "₹1,00,000", "¥180,000",
+    "USD 800-1200", "INR 65,000 - 1,00,000", "JPY 120,000 - 180,000",
+    "$250 to $400", "Rs. 20,000 to Rs. 35,000", "¥37,000 to ¥60,000",
+    "Approximately $500", "Approx. ₹40,000", "約75,000円",
+    "1.2k-1.8k", "1 - 1.5 lakh", "1.5 lakh", "2 crore",
+    "$2,500.00", "₹2,07,500.00", "¥375,000",
+    "between $300 and $450", "₹25k–₹37k", "45,000 – 68,000 yen",
+    "N/A", "", "Not determinable from the image",
+    "$50", "₹4,000", "¥7,500",
+    "1.234,50 €", "12,5", "1'500",
+]
+
+
+_PROMPT_FORMAT = re.compile(r"\d+(?:-\d+)?")
+
+
+def _legacy_parse(s):
+    """The pre-cost_parser implementation (normalize._parse_number_from_string)."""
+    if s is None:
+        return 0.0
+    if isinstance(s, (int, float)):
+        return abs(float(s))
+    s = str(s)
+    s_clean = s.replace(",", "")
+    nums = re.findall(r"\d+(?:\.\d+)?", s_clean)
+    if not nums:
+        return 0.0
+    try:
+        values = [float(n) for n in nums]
+        if len(values) >= 2:
+            return sum(values[:2]) / 2.0
+        return values[0]
+    except:
+        return 0.0
+
+
+def _time(fns, corpus, repeat, rounds=7):
+    """
+    Best of `rounds` timings of each function, in ns per call. Rounds are
+    interleaved across the functions so drift in machine speed hits them alike.
+    """
+    best = [float("inf")] * len(fns)
+    for _ in range(rounds):
+        for i, fn in enumerate(fns):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                for s in corpus:
+                    fn(s)
+            best[i] = min(best[i], time.perf_counter() - start)
+    return [b / (repeat * len(corpus)) * 1e9 for b in best]
+
+
+def _report(title, corpus, repeat, fns):
+    legacy_ns, *others = _time([_legacy_parse] + [fn for _, fn in fns], corpus, repeat)
+    print(title)
+    print(f"{'legacy':>22}{legacy_ns:>10.0f} ns/call")
+    for (label, _), ns in zip(fns, others):
+        print(f"{label:>22}{ns:>10.0f} ns/call  ({legacy_ns / ns:.2f}x legacy)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=None)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    corpus = CORPUS
+    if args.corpus:
+        with open(args.corpus, encoding="utf-8") as f:
+            corpus = [line.rstrip("\n") for line in f]
+
+    _report(
+        f"{len(corpus)} strings x {args.repeat}",
+        corpus,
+        args.repeat,
+        [("first-seen", _scan), ("cached (reference)", parse_cost)],
+    )
+    plain = [s for s in corpus if _PROMPT_FORMAT.fullmatch(s)]
+    if plain:
+        print()
+        _report(f"{len(plain)} of them in the prompt's format", plain, args.repeat, [("first-seen", _scan)])
+
+    diffs = [(s, _legacy_parse(s), parse_cost(s).mid) for s in corpus if _legacy_parse(s) != parse_cost(s).mid]
+    if diffs:
+        print(f"\n{len(diffs)} strings parse differently (legacy -> new midpoint):")
+        for s, old, new in diffs:
+            print(f"  {s!r:<36} {old:>14,.2f} -> {new:>14,.2f}")
+
+
+if __name__ == "__main__":
+    main()
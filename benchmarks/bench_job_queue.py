@@ -0,0 +1,92 @@
+# benchmarks/bench_job_queue.py
+"""
+Throughput of the SQLite-backed job queue (backend.jobs.JobStore).
+
+    python -m benchmarks.bench_job_queue [--jobs 5000] [--processes 1 2 4 8]
+
+For each process count, a fresh database is filled with --jobs jobs and that
+many worker processes claim and complete them with a no-op handler. Reports
+enqueue rate, claim+complete rate, and checks that every job ran exactly once.
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base, AnalysisJob, enable_sqlite_pragmas
+from backend.jobs import JobStore
+
+
+def _store(url):
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    enable_sqlite_pragmas(engine)
+    return engine, JobStore(session_factory=sessionmaker(bind=engine), lease_seconds=300)
+
+
+def _worker(url, owner, out):
+    engine, store = _store(url)
+    done = 0
+    while True:
+        job = store.claim(owner)
+        if job is None:
+            break
+        store.complete(job["job_id"], owner, {"ok": True})
+        done += 1
+    engine.dispose()
+    out.put(done)
+
+
+def run(jobs, processes):
+    url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='car-ai-jobs-'), 'jobs.db')}"
+    engine, store = _store(url)
+    Base.metadata.create_all(bind=engine)
+
+    start = time.perf_counter()
+    for i in range(jobs):
+        store.enqueue({"unique_name": f"bench-{i}.jpg"})
+    enqueue_s = time.perf_counter() - start
+
+    out = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=_worker, args=(url, f"bench:{p}", out)) for p in range(processes)]
+    start = time.perf_counter()
+    for p in procs:
+        p.start()
+    counts = [out.get() for _ in procs]
+    for p in procs:
+        p.join()
+    drain_s = time.perf_counter() - start
+
+    with sessionmaker(bind=engine)() as db:
+        done = db.execute(select(func.count()).where(AnalysisJob.status == "done")).scalar()
+        over = db.execute(select(func.count()).where(AnalysisJob.attempts > 1)).scalar()
+    engine.dispose()
+    return {
+        "enqueue/s": jobs / enqueue_s,
+        "processed/s": jobs / drain_s,
+        "processed": sum(counts),
+        "done rows": done,
+        "re-claimed": over,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=5000)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    print(f"{'procs':>6}{'enqueue/s':>12}{'processed/s':>14}{'processed':>11}{'done rows':>11}{'re-claimed':>12}")
+    for n in args.processes:
+        r = run(args.jobs, n)
+        print(
+            f"{n:>6}{r['enqueue/s']:>12.0f}{r['processed/s']:>14.0f}"
+            f"{r['processed']:>11}{r['done rows']:>11}{r['re-claimed']:>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# benchmarks/bench_preprocess.py
+"""
+Bytes saved and latency of backend.preprocess.prepare_for_model, per input size bucket.
+
+    python -m benchmarks.bench_preprocess [image files...] [--max-edge 1568] [--format JPEG] [--quality 85]
+
+Without file arguments it uses everything in uploads/ plus synthetic phone-sized
+JPEGs so every bucket is populated.
+"""
+import argparse
+import glob
+import os
+import statistics
+import time
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+from backend.preprocess import prepare_for_model
+
+BUCKETS = [
+    ("< 1 MB", 0, 1 << 20),
+    ("1-4 MB", 1 << 20, 4 << 20),
+    ("4-8 MB", 4 << 20, 8 << 20),
+    (">= 8 MB", 8 << 20, float("inf")),
+]
+
+
+def _synthetic_jpeg(width, height, quality=95, seed=0):
+    """Smooth gradient plus noise: compresses roughly like a real photo."""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width]
+    base = np.stack([(x * 255 // width), (y * 255 // height), ((x + y) * 127 // (width + height))], axis=-1)
+    noisy = np.clip(base + rng.normal(0, 18, base.shape), 0, 255).astype(np.uint8)
+    buf = BytesIO()
+    Image.fromarray(noisy, "RGB").save(buf, format="JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def _load_inputs(paths):
+    inputs = []
+    for path in paths:
+        with open(path, "rb") as f:
+            inputs.append((os.path.basename(path), f.read()))
+    return inputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*")
+    parser.add_argument("--max-edge", type=int, default=None)
+    parser.add_argument("--format", default=None)
+    parser.add_argument("--quality", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    paths = args.files or sorted(glob.glob(os.path.join("uploads", "*.jpg")) + glob.glob(os.path.join("uploads", "*.png")))
+    inputs = _load_inputs(paths)
+    if not args.files:
+        for i, (w, h) in enumerate([(1600, 1200), (3024, 4032), (4000, 3000), (6000, 4000)]):
+            inputs.append((f"synthetic-{w}x{h}.jpg", _synthetic_jpeg(w, h, seed=i)))
+
+    kwargs = {}
+    if args.max_edge:
+        kwargs["max_edge"] = args.max_edge
+    if args.format:
+        kwargs["fmt"] = args.format.upper()
+    if args.quality:
+        kwargs["quality"] = args.quality
+
+    per_bucket = {name: {"n": 0, "in": 0, "out": 0, "ms": []} for name, _, _ in BUCKETS}
+    for name, data in inputs:
+        timings = []
+        for _ in range(max(1, args.repeat)):
+            start = time.perf_counter()
+            prepared = prepare_for_model(data, **kwargs)
+            timings.append((time.perf_counter() - start) * 1000.0)
+        bucket = next(b for b, lo, hi in BUCKETS if lo <= len(data) < hi)
+        stats = per_bucket[bucket]
+        stats["n"] += 1
+        stats["in"] += len(data)
+        stats["out"] += len(prepared.data)
+        stats["ms"].append(statistics.median(timings))
+
+    print(f"{'bucket':<10}{'images':>8}{'avg in KB':>12}{'avg out KB':>12}{'saved':>8}{'p50 ms':>10}{'max ms':>10}")
+    for name, _, _ in BUCKETS:
+        stats = per_bucket[name]
+        if not stats["n"]:
+            continue
+        saved = 1.0 - stats["out"] / stats["in"] if stats["in"] else 0.0
+        print(
+            f"{name:<10}{stats['n']:>8}{stats['in'] / stats['n'] / 1024:>12.1f}"
+            f"{stats['out'] / stats['n'] / 1024:>12.1f}{saved:>8.1%}"
+            f"{statistics.median(stats['ms']):>10.1f}{max(stats['ms']):>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# benchmarks/bench_sqlite_concurrency.py
+"""
+Reader latency under concurrent writes, with SQLite defaults vs. the tuned pragmas
+from backend.database (WAL, synchronous=NORMAL, cache/mmap sizing, busy_timeout).
+
+    python -m benchmarks.bench_sqlite_concurrency [--seconds 10] [--writers 2] [--readers 4] [--seed-rows 20000]
+
+Each run uses a fresh database file in a temp directory. Writers insert one
+Analysis row per commit (like /analyze/); readers fetch the first /history page.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base, Analysis, enable_sqlite_pragmas
+
+
+def _row(i):
+    return Analysis(
+        image_path=f"/uploads/bench-{i}.jpg",
+        damage_type="dent (front bumper)",
+        location="front bumper",
+        cost_inr=8000.0,
+        cost_usd=100.0,
+        cost_yen=15000.0,
+        created_at=datetime.utcnow(),
+    )
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def run(tuned, seconds, writers, readers, seed_rows):
+    tmpdir = tempfile.mkdtemp(prefix="car-ai-bench-")
+    url = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    if tuned:
+        enable_sqlite_pragmas(engine)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    with Session() as db:
+        db.add_all(_row(i) for i in range(seed_rows))
+        db.commit()
+
+    stop = threading.Event()
+    read_ms, write_ms, errors = [], [], []
+    lock = threading.Lock()
+
+    def writer(wid):
+        i = 0
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                with Session() as db:
+                    db.add(_row(wid * 10_000_000 + i))
+                    db.commit()
+            except Exception as e:
+                with lock:
+                    errors.append(repr(e))
+                continue
+            with lock:
+                write_ms.append((time.perf_counter() - start) * 1000.0)
+            i += 1
+
+    def reader():
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                with Session() as db:
+                    (db.query(Analysis)
+                       .order_by(Analysis.created_at.desc(), Analysis.id.desc())
+                       .limit(50)
+                       .all())
+            except Exception as e:
+                with lock:
+                    errors.append(repr(e))
+                continue
+            with lock:
+                read_ms.append((time.perf_counter() - start) * 1000.0)
+
+    threads = [threading.Thread(target=writer, args=(w,)) for w in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    engine.dispose()
+
+    return {
+        "reads/s": len(read_ms) / seconds,
+        "read p50 ms": statistics.median(read_ms) if read_ms else 0.0,
+        "read p99 ms": _percentile(read_ms, 0.99),
+        "writes/s": len(write_ms) / seconds,
+        "write p50 ms": statistics.median(write_ms) if write_ms else 0.0,
+        "write p99 ms": _percentile(write_ms, 0.99),
+        "errors": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seed-rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    results = {
+        "default": run(False, args.seconds, args.writers, args.readers, args.seed_rows),
+        "tuned": run(True, args.seconds, args.writers, args.readers, args.seed_rows),
+    }
+    metrics = list(results["default"].keys())
+    print(f"{'metric':<16}{'default':>12}{'tuned':>12}")
+    for m in metrics:
+        print(f"{m:<16}{results['default'][m]:>12.2f}{results['tuned'][m]:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
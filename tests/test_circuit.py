@@ -0,0 +1,95 @@
+import time
+
+import pytest
+
+from backend.circuit import CircuitBreaker, CircuitOpenError
+
+
+def _breaker(**kwargs):
+    options = dict(failure_ratio=0.5, window=4, min_calls=4, slow_call_seconds=1.0, open_seconds=0.05, probe_calls=2)
+    options.update(kwargs)
+    return CircuitBreaker(**options)
+
+
+def _call(breaker, seconds=0.1, failed=False):
+    breaker.record(breaker.before_call(), seconds, failed)
+
+
+def _trip(breaker):
+    for failed in (True, True, False, False):
+        _call(breaker, failed=failed)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_opens_once_the_failure_ratio_is_reached():
+    breaker = _breaker()
+    for _ in range(3):
+        _call(breaker, failed=True)
+    assert breaker.state == CircuitBreaker.CLOSED  # fewer than min_calls
+    _call(breaker)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_slow_calls_count_as_failures():
+    breaker = _breaker()
+    for _ in range(2):
+        _call(breaker, seconds=5.0)
+    for _ in range(2):
+        _call(breaker)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_open_rejects_with_retry_after():
+    breaker = _breaker(open_seconds=30.0)
+    _trip(breaker)
+    with pytest.raises(CircuitOpenError) as exc:
+        breaker.before_call()
+    assert 0 < exc.value.retry_after <= 30.0
+
+
+def test_probes_close_the_breaker():
+    breaker = _breaker()
+    _trip(breaker)
+    time.sleep(0.06)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    probes = [breaker.before_call(), breaker.before_call()]
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # only probe_calls at a time
+    for token in probes:
+        breaker.record(token, 0.1, failed=False)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_failed_probe_reopens():
+    breaker = _breaker()
+    _trip(breaker)
+    time.sleep(0.06)
+    _call(breaker, failed=True)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_released_probe_slot_can_be_reused():
+    breaker = _breaker(probe_calls=1)
+    _trip(breaker)
+    time.sleep(0.06)
+    breaker.release_probe(breaker.before_call())
+    _call(breaker)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_outcomes_from_before_the_breaker_opened_are_ignored():
+    breaker = _breaker(probe_calls=1)
+    stale = [breaker.before_call() for _ in range(2)]
+    _trip(breaker)
+    time.sleep(0.06)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    # a slow call started while closed neither re-opens nor counts as a probe
+    breaker.record(stale[0], 5.0, failed=False)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.record(stale[1], 0.1, failed=False)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    _call(breaker)
+    assert breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,71 @@
+import pytest
+
+from backend.cost_parser import ZERO_COST, CostRange, _scan, parse_cost
+
+
+@pytest.mark.parametrize(
+    "text, low, high",
+    [
+        # currency code or word glued to the number must not eat its digits
+        ("500USD", 500, 500),
+        ("75usd", 75, 75),
+        ("1500INR", 1500, 1500),
+        ("2000yen", 2000, 2000),
+        ("100-200USD", 100, 200),
+        ("500 kg", 500, 500),
+        # plain amounts and ranges
+        ("300", 300, 300),
+        ("150-250", 150, 250),
+        ("$400 - $650", 400, 650),
+        ("$250 to $400", 250, 400),
+        ("between $300 and $450", 300, 450),
+        ("Rs. 20,000 to Rs. 35,000", 20000, 35000),
+        ("¥60,000-¥97,000", 60000, 97000),
+        ("45,000 – 68,000 yen", 45000, 68000),
+        ("USD 800-1200", 800, 1200),
+        ("Approximately $500", 500, 500),
+        ("約75,000円", 75000, 75000),
+        # units
+        ("12-15k", 12000, 15000),
+        ("12k–15k", 12000, 15000),
+        ("1500-2k", 1500, 2000),
+        ("₹25k–₹37k", 25000, 37000),
+        ("1.5 lakh", 150000, 150000),
+        ("1 - 1.5 lakh", 100000, 150000),
+        ("2 crores", 2e7, 2e7),
+        ("3 million", 3e6, 3e6),
+        # grouping and decimal separators
+        ("$1,200", 1200, 1200),
+        ("₹1,00,000", 100000, 100000),
+        ("$2,500.00", 2500, 2500),
+        ("1.234,50 €", 1234.5, 1234.5),
+        ("1.234.567", 1234567, 1234567),
+        ("12,5", 12.5, 12.5),
+        ("1'500", 1500, 1500),
+        ("1 500", 1500, 1500),
+        # reversed range
+        ("650-400", 400, 650),
+    ],
+)
+def test_parse_cost_strings(text, low, high):
+    result = parse_cost(text)
+    assert (result.low, result.high) == (low, high)
+    assert result.mid == (low + high) / 2
+    assert _scan(text) == result
+
+
+@pytest.mark.parametrize("text", ["", "N/A", "Not determinable from the image"])
+def test_parse_cost_unparseable(text):
+    assert parse_cost(text) == ZERO_COST
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (None, ZERO_COST),
+        (300, CostRange(300.0, 300.0, 300.0)),
+        (-12.5, CostRange(12.5, 12.5, 12.5)),
+    ],
+)
+def test_parse_cost_non_strings(value, expected):
+    assert parse_cost(value) == expected
@@ -0,0 +1,129 @@
+import asyncio
+import time
+
+import pytest
+
+from backend.circuit import CircuitOpenError
+from backend.jobs import JobQueue, JobStore, validate_callback_url
+
+
+@pytest.fixture
+def store(session_factory):
+    return JobStore(session_factory, lease_seconds=30, max_attempts=2, retry_backoff=0.05)
+
+
+def test_claim_leases_oldest_job_once(store):
+    first = store.enqueue({"n": 1})
+    store.enqueue({"n": 2})
+
+    job = store.claim("w1")
+    assert job["job_id"] == first
+    assert job["payload"] == {"n": 1}
+    assert job["attempts"] == 1
+    assert store.get(first)["status"] == "running"
+
+    # the leased job is not handed out again; the next one is
+    assert store.claim("w2")["payload"] == {"n": 2}
+    assert store.claim("w3") is None
+
+
+def test_expired_lease_is_claimed_again(session_factory):
+    store = JobStore(session_factory, lease_seconds=0.05, max_attempts=3)
+    job_id = store.enqueue({})
+    store.claim("w1")
+    time.sleep(0.1)
+
+    job = store.claim("w2")
+    assert job["job_id"] == job_id
+    assert job["attempts"] == 2
+    # the first worker lost its lease
+    assert not store.extend_lease(job_id, "w1")
+    assert not store.complete(job_id, "w1", {"ok": True})
+    assert store.extend_lease(job_id, "w2")
+
+
+def test_fail_requeues_with_backoff_then_marks_failed(store):
+    job_id = store.enqueue({})
+    job = store.claim("w1")
+    assert store.fail(job_id, "w1", job["attempts"], "boom") == "queued"
+    assert store.get(job_id)["status"] == "queued"
+    assert store.claim("w1") is None  # backing off
+    time.sleep(0.1)
+
+    job = store.claim("w1")
+    assert job["attempts"] == 2
+    assert store.fail(job_id, "w1", job["attempts"], "boom again") == "failed"
+    view = store.get(job_id)
+    assert view["status"] == "failed"
+    assert view["error"] == "boom again"
+    assert store.claim("w1") is None
+
+
+def test_fail_abandoned_only_expires_last_attempts(session_factory):
+    store = JobStore(session_factory, lease_seconds=0.05, max_attempts=1)
+    last = store.enqueue({})
+    store.claim("w1")
+    retryable = JobStore(session_factory, lease_seconds=0.05, max_attempts=2).enqueue({})
+    store.claim("w2")
+    time.sleep(0.1)
+
+    assert store.fail_abandoned() == 1
+    assert store.get(last)["status"] == "failed"
+    assert store.get(retryable)["status"] == "running"
+    assert store.claim("w3")["job_id"] == retryable
+
+
+def test_defer_gives_the_attempt_back(store):
+    job_id = store.enqueue({})
+    store.claim("w1")
+    assert store.defer(job_id, "w1", 0.05, "circuit open")
+    view = store.get(job_id)
+    assert view["status"] == "queued"
+    assert view["attempts"] == 0
+    assert store.claim("w1") is None
+    time.sleep(0.1)
+    assert store.claim("w1")["attempts"] == 1
+
+
+def test_worker_defers_jobs_while_the_circuit_is_open(store):
+    async def handler(payload):
+        raise CircuitOpenError("model backend unavailable (circuit open)", 30.0)
+
+    async def run():
+        queue = JobQueue(store, workers=1, poll_interval=0.01)
+        queue.start(handler)
+        job_id = await queue.enqueue({})
+        try:
+            for _ in range(200):
+                view = await queue.get(job_id)
+                if view["status"] == "queued" and "error" in view:
+                    return view
+                await asyncio.sleep(0.01)
+        finally:
+            await queue.stop()
+
+    view = asyncio.run(run())
+    assert view["attempts"] == 0
+    assert "circuit open" in view["error"]
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "ftp://example.com/hook",
+        "http://127.0.0.1/hook",
+        "http://localhost:8000/hook",
+        "http://10.0.0.5/hook",
+        "http://169.254.169.254/latest/meta-data",
+        "http:///hook",
+    ],
+)
+def test_validate_callback_url_rejects_internal_targets(url):
+    with pytest.raises(ValueError):
+        validate_callback_url(url, allowed_hosts=[])
+
+
+def test_validate_callback_url_allowlist():
+    validate_callback_url("https://hooks.example.com/x", allowed_hosts=[".example.com"])
+    with pytest.raises(ValueError):
+        validate_callback_url("https://example.org/x", allowed_hosts=[".example.com"])
@@ -0,0 +1,67 @@
+import threading
+import time
+
+import pytest
+
+from backend.ratelimit import FairSemaphore, ModelCallLimiter, RateLimitTimeout, TokenBucket
+
+
+def test_fair_semaphore_admits_waiters_in_arrival_order():
+    sem = FairSemaphore(1)
+    sem.acquire()
+    order = []
+
+    def waiter(n):
+        sem.acquire(timeout=5)
+        order.append(n)
+        sem.release()
+
+    threads = []
+    for n in range(5):
+        t = threading.Thread(target=waiter, args=(n,))
+        t.start()
+        threads.append(t)
+        time.sleep(0.02)  # make arrival order deterministic
+    sem.release()
+    for t in threads:
+        t.join(5)
+    assert order == [0, 1, 2, 3, 4]
+    assert sem.in_use == 0
+
+
+def test_fair_semaphore_timeout_leaves_the_queue():
+    sem = FairSemaphore(1)
+    sem.acquire()
+    started = time.monotonic()
+    with pytest.raises(RateLimitTimeout):
+        sem.acquire(timeout=0.05)
+    assert time.monotonic() - started >= 0.05
+
+    # the timed-out waiter does not block the next one
+    got = threading.Event()
+    t = threading.Thread(target=lambda: (sem.acquire(timeout=5), got.set()))
+    t.start()
+    sem.release()
+    t.join(5)
+    assert got.is_set()
+    assert sem.in_use == 1
+
+
+def test_limiter_bounds_calls_in_flight():
+    limiter = ModelCallLimiter(max_in_flight=1, max_wait=0.05)
+    with limiter.slot():
+        with pytest.raises(RateLimitTimeout):
+            with limiter.slot():
+                pass
+    with limiter.slot():
+        pass
+
+
+def test_limiter_reports_when_the_bucket_refills():
+    limiter = ModelCallLimiter(max_in_flight=4, bucket=TokenBucket(rate_per_minute=60, burst=1), max_wait=0.05)
+    with limiter.slot():
+        pass
+    with pytest.raises(RateLimitTimeout) as exc:
+        with limiter.slot():
+            pass
+    assert 0.5 < exc.value.retry_after <= 1.0
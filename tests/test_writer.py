@@ -0,0 +1,61 @@
+import pytest
+
+from backend.database import Analysis, ImageDigest
+from backend.writer import AnalysisWriter
+
+
+def _entry(n):
+    return Analysis(
+        image_path=f"/uploads/{n}.jpg",
+        damage_type="dent",
+        location="hood",
+        cost_inr=0.0,
+        cost_usd=float(n),
+        cost_yen=0.0,
+    )
+
+
+def test_rows_submitted_together_commit_in_one_batch(session_factory):
+    writer = AnalysisWriter(session_factory, batch_size=10, flush_interval=0.2)
+    sessions = []
+
+    def on_insert(session, row):
+        sessions.append(session)
+
+    futures = [writer.submit(_entry(n), on_insert=on_insert) for n in range(3)]
+    ids = [f.result(timeout=5) for f in futures]
+    writer.stop(timeout=5)
+
+    assert len(set(ids)) == 3
+    assert len({id(s) for s in sessions}) == 1
+    with session_factory() as db:
+        assert db.query(Analysis).count() == 3
+
+
+def test_a_failing_row_is_retried_alone(session_factory):
+    writer = AnalysisWriter(session_factory, batch_size=10, flush_interval=0.2)
+
+    def bad_hook(session, row):
+        raise RuntimeError("hook failed")
+
+    def digest_hook(session, row):
+        session.add(ImageDigest(digest=f"d{row.id}", analysis_id=row.id, result_json="{}"))
+
+    good = [writer.submit(_entry(n), on_insert=digest_hook) for n in range(2)]
+    bad = writer.submit(_entry(99), on_insert=bad_hook)
+    ids = [f.result(timeout=5) for f in good]
+    with pytest.raises(RuntimeError):
+        bad.result(timeout=5)
+    writer.stop(timeout=5)
+
+    with session_factory() as db:
+        assert sorted(r.id for r in db.query(Analysis)) == sorted(ids)
+        assert db.query(Analysis).filter_by(cost_usd=99.0).count() == 0
+        assert db.query(ImageDigest).count() == 2
+
+
+def test_stop_flushes_queued_rows(session_factory):
+    writer = AnalysisWriter(session_factory, batch_size=2, flush_interval=10.0)
+    futures = [writer.submit(_entry(n)) for n in range(5)]
+    writer.stop(timeout=5)
+    assert all(f.done() and f.exception() is None for f in futures)